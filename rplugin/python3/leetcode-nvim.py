@@ -1,13 +1,29 @@
+import collections
+import concurrent.futures
+import contextlib
+import cProfile
+import email.utils
+import functools
+import hashlib
+import heapq
+import http.cookiejar
+import io
+import itertools
 import json
+import math
 import neovim
 import os
 import pathlib
+import pstats
+import queue
 import re
 import requests
 import shutil
 import subprocess
 import threading
 import time
+import tracemalloc
+import urllib.parse
 from bs4 import BeautifulSoup
 
 try:
@@ -22,8 +38,50 @@ LC_PROBLEMS = LC_HOME + 'problems.json'
 LC_PROBLEMS_TMP = LC_HOME + 'problems_tmp.txt'
 LC_CARDS_TMP = LC_HOME + 'cards_tmp.txt'
 LC_ACLIST = LC_HOME + 'ac.txt'
+LC_OUTBOX = LC_HOME + 'outbox.json'
+LC_STATS = LC_HOME + 'stats.json'
 LC_PROBLEMS_HOME = LC_HOME + 'problems/'
 LC_SOLUTIONS_HOME = LC_HOME + 'solutions/'
+LC_SUBMISSIONS_HOME = LC_HOME + 'submissions/'
+LC_EXPLORE_HOME = LC_HOME + 'explore/'
+LC_PREVIEW_HOME = LC_HOME + 'preview/'
+LC_PROFILES_HOME = LC_HOME + 'profiles/'
+LC_CONTESTS_HOME = LC_HOME + 'contests/'
+
+LC_DEFAULT_ACCOUNT = 'default'
+LC_SHARED_PATHS = (LC_HOME, LC_CONFIG, LC_SESSION, LC_PREVIEW_HOME, LC_PROFILES_HOME)
+LC_ENDPOINT_PATHS = (LC_EXPLORE_HOME, LC_CONTESTS_HOME)
+LC_LEGACY_PATHS = (LC_PROBLEMS, LC_PROBLEMS_TMP, LC_CARDS_TMP, LC_ACLIST, LC_OUTBOX, LC_STATS,
+                   LC_PROBLEMS_HOME, LC_SOLUTIONS_HOME, LC_SUBMISSIONS_HOME, LC_EXPLORE_HOME)
+
+LC_TRACE_WINDOW = 200
+LC_PROFILE_TOP = 30
+LC_PROFILE_FRAMES = 10
+LC_STREAM_CHUNK = 64 * 1024
+
+LC_PRIORITY_INTERACTIVE = 0
+LC_PRIORITY_BACKGROUND = 1
+
+LC_RATE_LIMIT = 2.0
+LC_RATE_BURST = 4
+LC_RETRY_STATUS = (429, 500, 502, 503, 504)
+LC_MAX_RETRIES = 3
+LC_RETRY_BACKOFF = 0.5
+LC_PROBE_TIMEOUT = 5
+LC_POLL_INTERVAL = 1.0
+LC_POLL_TIMEOUT = 30
+LC_POOL_SIZE = 8
+LC_CONTEST_WARMUP = 10
+LC_CONTEST_RETRIES = 10
+
+LC_SUBMISSIONS_PAGE_SIZE = 20
+LC_SUBMISSIONS_TTL = 300
+LC_EXPLORE_TTL = 24 * 3600
+LC_EXPLORE_INDENT = '  '
+LC_PREVIEW_CACHE_SIZE = 64
+LC_RESULT_MAX_LINES = 200
+LC_RESULT_MAX_COLUMNS = 1000
+LC_RECENT_SOLVED = 10
 
 LC_PROBLEM_ALL = 'all'
 LC_PROBLEM_ALGORITHMS = 'algorithms'
@@ -33,6 +91,8 @@ LC_PROBLEM_CONCURRENCY = 'concurrency'
 
 LC_PROBLEM_REPR_FULL = 'No. %04d %s %s'
 LC_PROBLEM_REPR_COMPACT = 'no-%04d-%s'
+LC_SCRATCH_PREFIX = 'leetcode://'
+LC_MORE_LINE = '-- more: call LCSubmissions("more") --'
 
 REGEXP_LINE = 'No\\. (\\d+) .* <([A-Za-z0-9\\-]*)> .*'
 REGEXP_ATTRS = '___([a-zA-Z0-9-_=]+)___'
@@ -47,6 +107,12 @@ LEVELS = {
     3: '<H>'
 }
 
+DIFFICULTIES = {
+    'Easy': 1,
+    'Medium': 2,
+    'Hard': 3
+}
+
 URLS = {
     'home': 'https://%s',
     'login': 'https://%s/accounts/login/',
@@ -60,8 +126,11 @@ URLS = {
     'run': 'https://%s/problems/%s/interpret_solution/',
     'run_check': 'https://%s/submissions/detail/%s/check/',
     'latest_submission': 'https://%s/submissions/latest/',
+    'submissions': 'https://%s/api/submissions/%s/',
     'submit': 'https://%s/problems/%s/submit/',
-    'explore': 'https://%s/explore/'
+    'explore': 'https://%s/explore/',
+    'contest': 'https://%s/contest/%s/',
+    'contest_info': 'https://%s/contest/api/info/%s/'
 }
 
 EXTENSIONS = {
@@ -120,28 +189,739 @@ class Line(object):
         return self._build()
 
 
+class _ProblemRecord(object):
+    __slots__ = ('question_id', 'title', 'title_slug', 'level', 'status')
+
+    def __init__(self, question_id, title, title_slug, level, status):
+        self.question_id = question_id
+        self.title = title
+        self.title_slug = title_slug
+        self.level = level
+        self.status = status
+
+    @staticmethod
+    def from_pair(pair):
+        stat = pair['stat']
+        return _ProblemRecord(stat['question_id'], stat['question__title'], stat['question__title_slug'],
+                              pair['difficulty']['level'], pair.get('status'))
+
+
+def _iter_problem_records(inf, chunk_size=LC_STREAM_CHUNK):
+    decoder = json.JSONDecoder()
+    marker = '"stat_status_pairs"'
+    buf = ''
+    eof = False
+
+    def fill():
+        nonlocal buf, eof
+        chunk = inf.read(chunk_size)
+        if chunk:
+            buf += chunk
+        else:
+            eof = True
+
+    index = -1
+    searched = 0
+    while index < 0:
+        if eof:
+            raise ValueError('stat_status_pairs not found')
+        fill()
+        index = buf.find(marker, searched)
+        searched = max(0, len(buf) - len(marker))
+    pos = index + len(marker)
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip(' \t\r\n:')
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError('stat_status_pairs is not a list')
+    pos += 1
+    while True:
+        skip(' \t\r\n,')
+        if pos >= len(buf):
+            raise ValueError('unexpected end of stat_status_pairs')
+        if buf[pos] == ']':
+            return
+        try:
+            pair, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            fill()
+            continue
+        yield _ProblemRecord.from_pair(pair)
+        pos = end
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def _tmp_path(f):
+    return '%s.%d-%d.tmp' % (f, os.getpid(), threading.get_ident())
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    index = max(0, math.ceil(q * len(sorted_samples)) - 1)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+class _NullSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = ('_tracer', '_phase', '_start')
+
+    def __init__(self, tracer, phase):
+        self._tracer = tracer
+        self._phase = phase
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._tracer.record(self._phase, time.perf_counter() - self._start)
+        return False
+
+
+class _CommandSpan(_Span):
+    __slots__ = ('_command', '_parent')
+
+    def __init__(self, tracer, command):
+        super().__init__(tracer, 'total')
+        self._command = command
+        self._parent = None
+
+    def __enter__(self):
+        self._parent = self._tracer.current_command()
+        self._tracer.set_command(self._command)
+        return super().__enter__()
+
+    def __exit__(self, *exc_info):
+        super().__exit__(*exc_info)
+        self._tracer.set_command(self._parent)
+        return False
+
+
+class _Tracer(object):
+
+    def __init__(self, window=LC_TRACE_WINDOW):
+        self.enabled = False
+        self._window = window
+        self._samples = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._outf = None
+
+    def configure(self, enabled, trace_file=None, window=None):
+        with self._lock:
+            if window:
+                self._window = int(window)
+                self._samples = {k: collections.deque(v, maxlen=self._window) for k, v in self._samples.items()}
+            if trace_file is None:
+                trace_file = self._trace_file
+            if self._outf is not None and (trace_file != self._trace_file or not enabled):
+                self._outf.close()
+                self._outf = None
+            self._trace_file = trace_file
+            self.enabled = enabled
+
+    def current_command(self):
+        return getattr(self._local, 'command', None)
+
+    def set_command(self, command):
+        self._local.command = command
+
+    def command(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _CommandSpan(self, name)
+
+    def span(self, phase):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, phase)
+
+    def record(self, phase, seconds):
+        command = self.current_command() or '-'
+        with self._lock:
+            key = (command, phase)
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = collections.deque(maxlen=self._window)
+            samples.append(seconds)
+            if self._trace_file:
+                if self._outf is None:
+                    self._outf = open(self._trace_file, 'a', buffering=1)
+                self._outf.write(json.dumps({
+                    'ts': time.time(),
+                    'command': command,
+                    'phase': phase,
+                    'ms': round(seconds * 1000, 3),
+                    'thread': threading.current_thread().name
+                }) + '\n')
+
+    def clear(self):
+        with self._lock:
+            self._samples = {}
+
+    def summary(self):
+        with self._lock:
+            items = [(k, sorted(v)) for k, v in self._samples.items() if v]
+        rows = []
+        for (command, phase), samples in sorted(items):
+            rows.append((command, phase, len(samples),
+                         _percentile(samples, 0.5) * 1000,
+                         _percentile(samples, 0.95) * 1000,
+                         samples[-1] * 1000))
+        return rows
+
+    def report(self):
+        rows = self.summary()
+        if not rows:
+            return 'No trace samples yet!'
+        lines = ['%-24s %-12s %6s %10s %10s %10s' % ('command', 'phase', 'count', 'p50(ms)', 'p95(ms)', 'max(ms)')]
+        for row in rows:
+            lines.append('%-24s %-12s %6d %10.2f %10.2f %10.2f' % row)
+        return '\n'.join(lines)
+
+
+TRACER = _Tracer()
+
+
+class _Profiler(object):
+
+    def __init__(self):
+        self.active = False
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._busy = False
+        self._started = None
+        self._snapshot = None
+        self._owns_tracemalloc = False
+
+    def start(self, frames=LC_PROFILE_FRAMES):
+        with self._lock:
+            if self.active:
+                return False
+            self._profiles = {}
+            self._started = time.time()
+            self._owns_tracemalloc = not tracemalloc.is_tracing()
+            if self._owns_tracemalloc:
+                tracemalloc.start(frames)
+            self._snapshot = tracemalloc.take_snapshot()
+            self.active = True
+            return True
+
+    @contextlib.contextmanager
+    def command(self, name):
+        with self._lock:
+            profile = None
+            if self.active and not self._busy:
+                profile = self._profiles.get(name)
+                if profile is None:
+                    profile = self._profiles[name] = cProfile.Profile()
+                self._busy = True
+        if profile is None:
+            yield
+            return
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._busy = False
+
+    def stop(self, directory, top=LC_PROFILE_TOP):
+        with self._lock:
+            if not self.active:
+                return None
+            self.active = False
+            profiles, self._profiles = self._profiles, {}
+            snapshot = tracemalloc.take_snapshot()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+            before, self._snapshot = self._snapshot, None
+        prefix = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started)))
+        lines = ['Profiled %.1fs, %d commands' % (time.time() - self._started, len(profiles)), '']
+        for name, profile in sorted(profiles.items()):
+            profile.dump_stats('%s-%s.pstats' % (prefix, name))
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+            lines.append('== %s ==' % name)
+            lines.append(out.getvalue())
+        lines.append('== allocations since start (top %d) ==' % top)
+        for stat in snapshot.compare_to(before, 'traceback')[:top]:
+            lines.append(str(stat))
+            lines.extend('    ' + line for line in stat.traceback.format(limit=3))
+        lines.append('')
+        lines.append('== live allocations (top %d) ==' % top)
+        for stat in snapshot.statistics('lineno')[:top]:
+            lines.append(str(stat))
+        report = prefix + '-report.txt'
+        with open(report, 'w') as outf:
+            outf.write('\n'.join(lines) + '\n')
+        return report
+
+    def status(self):
+        if not self.active:
+            return 'Profiler is off!'
+        current, peak = tracemalloc.get_traced_memory()
+        return 'Profiling for %.1fs, %d commands seen, traced memory %.1f KiB (peak %.1f KiB)' % (
+            time.time() - self._started, len(self._profiles), current / 1024, peak / 1024)
+
+
+PROFILER = _Profiler()
+
+
+def _traced(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled and not PROFILER.active:
+                return fn(*args, **kwargs)
+            with TRACER.command(name), PROFILER.command(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class LeetcodeHttpError(RuntimeError):
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LeetcodeOfflineError(RuntimeError):
+    pass
+
+
+def _rate_settings(rate, burst):
+    try:
+        rate = float(rate)
+    except (TypeError, ValueError):
+        rate = 0.0
+    try:
+        burst = int(burst)
+    except (TypeError, ValueError):
+        burst = 0
+    return rate if rate > 0 else float(LC_RATE_LIMIT), burst if burst > 0 else LC_RATE_BURST
+
+
+class _RateLimiter(object):
+
+    def __init__(self, rate=LC_RATE_LIMIT, burst=LC_RATE_BURST):
+        self._rate, self._burst = _rate_settings(rate, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._acquired = [0, 0]
+        self._total_wait = [0.0, 0.0]
+        self._max_wait = [0.0, 0.0]
+
+    def configure(self, rate, burst):
+        with self._cond:
+            self._rate, self._burst = _rate_settings(rate, burst)
+            self._tokens = min(self._tokens, self._burst)
+            self._cond.notify_all()
+
+    def _refill(self, now):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, priority=LC_PRIORITY_INTERACTIVE):
+        start = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiting[0] == ticket and now >= self._paused_until and self._tokens >= 1:
+                    heapq.heappop(self._waiting)
+                    self._tokens -= 1
+                    self._cond.notify_all()
+                    break
+                if now < self._paused_until:
+                    timeout = self._paused_until - now
+                elif self._tokens < 1:
+                    timeout = (1 - self._tokens) / self._rate
+                else:
+                    timeout = None
+                self._cond.wait(timeout)
+            waited = time.monotonic() - start
+            self._acquired[priority] += 1
+            self._total_wait[priority] += waited
+            self._max_wait[priority] = max(self._max_wait[priority], waited)
+        return waited
+
+    def pause(self, seconds):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': len(self._waiting),
+                'tokens': self._tokens,
+                'paused_for': max(0.0, self._paused_until - time.monotonic()),
+                'acquired': list(self._acquired),
+                'avg_wait': [t / n if n else 0.0 for t, n in zip(self._total_wait, self._acquired)],
+                'max_wait': list(self._max_wait)
+            }
+
+    def report(self):
+        st = self.stats()
+        lines = ['Queue depth: %d, tokens: %.1f, paused for: %.1fs'
+                 % (st['queue_depth'], st['tokens'], st['paused_for'])]
+        for priority, name in ((LC_PRIORITY_INTERACTIVE, 'interactive'), (LC_PRIORITY_BACKGROUND, 'background')):
+            lines.append('%-12s requests: %d, avg wait: %.0f ms, max wait: %.0f ms'
+                         % (name, st['acquired'][priority], st['avg_wait'][priority] * 1000,
+                            st['max_wait'][priority] * 1000))
+        return '\n'.join(lines)
+
+
+class _RateLimiterPool(object):
+
+    def __init__(self, rate=LC_RATE_LIMIT, burst=LC_RATE_BURST):
+        self._rate, self._burst = _rate_settings(rate, burst)
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, rate, burst):
+        with self._lock:
+            self._rate, self._burst = _rate_settings(rate, burst)
+            limiters = list(self._limiters.values())
+        for limiter in limiters:
+            limiter.configure(self._rate, self._burst)
+
+    @contextlib.contextmanager
+    def priority(self, priority):
+        parent = self.current_priority()
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = parent
+
+    def current_priority(self):
+        return getattr(self._local, 'priority', LC_PRIORITY_INTERACTIVE)
+
+    def for_host(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = _RateLimiter(self._rate, self._burst)
+            return limiter
+
+    def acquire(self, host):
+        return self.for_host(host).acquire(self.current_priority())
+
+    def pause(self, host, seconds):
+        self.for_host(host).pause(seconds)
+
+    def report(self):
+        with self._lock:
+            limiters = sorted(self._limiters.items())
+        if not limiters:
+            return 'No requests sent yet!'
+        return '\n'.join('[%s]\n%s' % (host, limiter.report()) for host, limiter in limiters)
+
+
+RATE_LIMITER = _RateLimiterPool()
+
+
+def _new_http_session(pool_size=LC_POOL_SIZE):
+    session = requests.Session()
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+HTTP = _new_http_session()
+
+
+class _Debouncer(object):
+
+    def __init__(self, delay, fn):
+        self._delay = delay
+        self._fn = fn
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def trigger(self, key, *args):
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self._delay, self._fire, args=(key,) + args)
+            timer.daemon = True
+            self._timers[key] = timer
+            timer.start()
+
+    def cancel(self, key):
+        with self._lock:
+            timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _fire(self, key, *args):
+        with self._lock:
+            if self._timers.get(key) is not threading.current_thread():
+                return
+            del self._timers[key]
+        self._fn(key, *args)
+
+
+class _Worker(object):
+
+    def __init__(self, name, maxsize=16):
+        self._name = name
+        self._queue = queue.Queue(maxsize)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.failures = 0
+        self.last_error = None
+
+    def submit(self, key, fn, *args):
+        with self._lock:
+            if key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((key, fn, args))
+            except queue.Full:
+                return False
+            self._pending.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name)
+                self._thread.daemon = True
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            key, fn, args = self._queue.get()
+            with TRACER.command(self._name):
+                start = time.perf_counter()
+                try:
+                    fn(*args)
+                except Exception as e:
+                    if TRACER.enabled:
+                        TRACER.record('failed', time.perf_counter() - start)
+                    with self._lock:
+                        self.failures += 1
+                        self.last_error = (time.time(), key, '%s: %s' % (type(e).__name__, e))
+                finally:
+                    with self._lock:
+                        self._pending.discard(key)
+
+    def report(self):
+        with self._lock:
+            if self.last_error is None:
+                return '%s: no failures' % self._name
+            when, key, error = self.last_error
+            return '%s: %d failure(s), last at %s for %s\n  %s' % (
+                self._name, self.failures, time.strftime('%H:%M:%S', time.localtime(when)), key, error)
+
+
+class _AudioPlayer(object):
+
+    def __init__(self):
+        self._worker = _Worker('leetcode-audio', maxsize=1)
+
+    def _play(self, path):
+        sound = os.path.abspath(os.path.expanduser(path))
+        if os.path.isfile(sound):
+            playsound(sound)
+
+    def play(self, path):
+        if playsound is None or not path:
+            return False
+        return self._worker.submit('audio', self._play, path)
+
+    def worker_report(self):
+        return self._worker.report()
+
+
+AUDIO = _AudioPlayer()
+
+
+class _ProgressStats(object):
+
+    def __init__(self, f):
+        self._f = f
+        self._lock = threading.Lock()
+        self._jo = None
+
+    @staticmethod
+    def _empty():
+        return {
+            'solved': {'total': 0, '1': 0, '2': 0, '3': 0},
+            'categories': {},
+            'streak': {'last_day': None, 'current': 0, 'best': 0, 'today': 0},
+            'recent': []
+        }
+
+    def _load(self):
+        if self._jo is None:
+            self._jo = self._empty()
+            if os.path.exists(self._f):
+                with TRACER.span('disk'), open(self._f, 'r') as inf:
+                    self._jo.update(json.load(inf))
+        return self._jo
+
+    def _save(self):
+        tmpf = _tmp_path(self._f)
+        with TRACER.span('disk'), open(tmpf, 'w') as outf:
+            json.dump(self._jo, outf)
+        os.replace(tmpf, self._f)
+
+    def record_catalogue(self, category, total, solved):
+        with self._lock:
+            jo = self._load()
+            jo['categories'][category] = {'total': total, 'solved': solved, 'updated': time.time()}
+            if category == LC_PROBLEM_ALL:
+                jo['solved'] = dict(solved)
+            self._save()
+
+    def _count_solved(self, jo, level):
+        jo['solved']['total'] += 1
+        if level:
+            jo['solved'][str(level)] += 1
+
+    def record_sync(self, level):
+        with self._lock:
+            self._count_solved(self._load(), level)
+            self._save()
+
+    def record_ac(self, problem_id, title, level, when=None, new=True):
+        when = when or time.time()
+        day = time.strftime('%Y-%m-%d', time.localtime(when))
+        yesterday = time.strftime('%Y-%m-%d', time.localtime(when - 86400))
+        with self._lock:
+            jo = self._load()
+            if new:
+                self._count_solved(jo, level)
+            streak = jo['streak']
+            if streak['last_day'] != day:
+                streak['current'] = streak['current'] + 1 if streak['last_day'] == yesterday else 1
+                streak['best'] = max(streak['best'], streak['current'])
+                streak['last_day'] = day
+                streak['today'] = 0
+            previous = next((x for x in jo['recent'] if x[1] == int(problem_id)), None)
+            if previous is None or time.strftime('%Y-%m-%d', time.localtime(previous[0])) != day:
+                streak['today'] += 1
+            recent = [x for x in jo['recent'] if x[1] != int(problem_id)]
+            jo['recent'] = [[when, int(problem_id), title, level]] + recent[:LC_RECENT_SOLVED - 1]
+            self._save()
+
+    def render(self, name):
+        with self._lock:
+            jo = json.loads(json.dumps(self._load()))
+        solved = jo['solved']
+        all_total = (jo['categories'].get(LC_PROBLEM_ALL) or {}).get('total') or {}
+        lines = ['Progress of %s' % name, '']
+
+        def ratio(done, total):
+            return '%5d / %-5s' % (done, total if total else '?')
+
+        lines.append('Solved     %s' % ratio(solved['total'], all_total.get('total')))
+        for level, label in ((1, 'Easy'), (2, 'Medium'), (3, 'Hard')):
+            lines.append('  %-8s %s' % (label, ratio(solved[str(level)], all_total.get(str(level)))))
+        lines.append('')
+        streak = jo['streak']
+        today = time.strftime('%Y-%m-%d')
+        yesterday = time.strftime('%Y-%m-%d', time.localtime(time.time() - 86400))
+        current = streak['current'] if streak['last_day'] in (today, yesterday) else 0
+        lines.append('Streak     %d day(s), best %d, solved today %d'
+                     % (current, streak['best'], streak['today'] if streak['last_day'] == today else 0))
+        if jo['categories']:
+            lines.append('')
+            lines.append('Categories (as of their last refresh)')
+            for category, counts in sorted(jo['categories'].items()):
+                lines.append('  %-12s %s  %s' % (category, ratio(counts['solved']['total'], counts['total']['total']),
+                                                  time.strftime('%Y-%m-%d %H:%M', time.localtime(counts['updated']))))
+        if jo['recent']:
+            lines.append('')
+            lines.append('Recently solved')
+            for when, problem_id, title, level in jo['recent']:
+                lines.append('  %s  No. %04d %s %s' % (time.strftime('%Y-%m-%d %H:%M', time.localtime(when)),
+                                                       problem_id, LEVELS.get(level, '<?>'), title))
+        return lines
+
+
 class LeetcodeSession:
+    _session_file_lock = threading.Lock()
 
-    def __init__(self, configs):
+    def __init__(self, configs, namespace=None, bound=True):
         self._configs = {
             'default_lang': 'java',
             **configs
         }
         self._endpoint = None
+        self._account = None
         self._csrftoken = None
         self._leetcode_session = None
         self._api = None
         self._repo_dir = None
         self._repo_solution_dir = None
+        self._catalogue = None
+        self._offline = bool(self._configs.get('offline'))
+        self._outbox_lock = threading.Lock()
+        self._problem_locks = {}
+        self._problem_locks_lock = threading.Lock()
+        self._rendered = collections.OrderedDict()
+        self._rendered_lock = threading.Lock()
+        self._ac_ids = None
+        self._ac_lock = threading.RLock()
+        self._stats = None
+        if bound:
+            self._read_session(namespace)
         self._init_leetcode_home()
-        self._read_session()
         if self.is_logged_in():
             self._init_api()
         if self.has_repo_path():
             self._init_repo()
 
     def _init_api(self):
-        self._api = _LeetcodeApi(self._endpoint, self._csrftoken, self._leetcode_session)
+        self._api = _LeetcodeApi(self._endpoint, self._csrftoken, self._leetcode_session,
+                                 self.get_config('base_url'),
+                                 self.get_config('poll_interval') or LC_POLL_INTERVAL,
+                                 self.get_config('poll_timeout') or LC_POLL_TIMEOUT)
 
     def get_api(self):
         return self._api
@@ -165,26 +945,39 @@ class LeetcodeSession:
         if not pathlib.Path(self._repo_solution_dir).exists():
             pathlib.Path(self._repo_solution_dir).mkdir(parents=True, exist_ok=True)
 
+    @staticmethod
+    def make_namespace(endpoint, account=None):
+        return '%s/%s' % (endpoint, re.sub(r'[^\w.-]', '_', account or LC_DEFAULT_ACCOUNT))
+
+    def namespace(self):
+        if self._endpoint is None:
+            return None
+        return self.make_namespace(self._endpoint, self._account)
+
     def _get_path(self, path):
-        return self._get_user_home() + path
+        if self._endpoint is None or path in LC_SHARED_PATHS:
+            return self._get_user_home() + path
+        if path in LC_ENDPOINT_PATHS:
+            return self._get_user_home() + LC_HOME + self._endpoint + '/' + path[len(LC_HOME):]
+        return self._get_user_home() + LC_HOME + self.namespace() + '/' + path[len(LC_HOME):]
 
-    def play_ringtone(self, name):
-        sound_path = self.get_config(name)
-        if sound_path is not None:
-            if playsound:
-                def play(p):
-                    playsound(p)
+    def get_namespace_dir(self):
+        return os.path.dirname(self._get_path(LC_PROBLEMS)) + '/'
 
-                th = threading.Thread(target=play, args=(sound_path,))
-                th.daemon = True
-                th.start()
+    def play_ringtone(self, name):
+        AUDIO.play(self.get_config(name))
 
     def _init_leetcode_home(self):
-        leetcode_home = self._get_path(LC_HOME)
-        if not pathlib.Path(leetcode_home).exists():
-            pathlib.Path(leetcode_home).mkdir(parents=True, exist_ok=True)
-            pathlib.Path(self._get_path(LC_PROBLEMS_HOME)).mkdir(parents=True, exist_ok=True)
-            pathlib.Path(self._get_path(LC_SOLUTIONS_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_PREVIEW_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_PROFILES_HOME)).mkdir(parents=True, exist_ok=True)
+        if self._endpoint is None:
+            return
+        pathlib.Path(self._get_path(LC_PROBLEMS_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_SOLUTIONS_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_SUBMISSIONS_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_EXPLORE_HOME)).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self._get_path(LC_CONTESTS_HOME)).mkdir(parents=True, exist_ok=True)
 
     def _init_lang_dir(self, lang, path):
         lang_dir_path = path + lang
@@ -209,98 +1002,260 @@ class LeetcodeSession:
     def has_repo_path(self):
         return self.get_config('repo_path') is not None
 
-    def _read_session(self):
-        f = self._get_path(LC_SESSION)
-        if os.path.exists(f):
-            with open(f, 'r') as inf:
-                jo = json.load(inf)
-                self._endpoint = jo['endpoint']
-                self._csrftoken = jo['csrftoken']
-                self._leetcode_session = jo['leetcode_session']
+    @staticmethod
+    def _read_session_file():
+        f = LeetcodeSession._get_user_home() + LC_SESSION
+        if not os.path.exists(f):
+            return {'active': None, 'sessions': {}}
+        with open(f, 'r') as inf:
+            jo = json.load(inf)
+        if 'sessions' not in jo:
+            namespace = '%s/%s' % (jo['endpoint'], LC_DEFAULT_ACCOUNT)
+            jo = {'active': namespace, 'legacy': True, 'sessions': {namespace: {**jo, 'account': LC_DEFAULT_ACCOUNT}}}
+        return jo
+
+    @staticmethod
+    def _write_session_file(jo):
+        f = LeetcodeSession._get_user_home() + LC_SESSION
+        tmpf = _tmp_path(f)
+        with open(tmpf, 'w') as outf:
+            json.dump({'active': jo['active'], 'sessions': jo['sessions']}, outf)
+        os.replace(tmpf, f)
+
+    @staticmethod
+    def get_namespaces():
+        with LeetcodeSession._session_file_lock:
+            jo = LeetcodeSession._read_session_file()
+        return jo['active'], sorted(jo['sessions'])
+
+    def _read_session(self, namespace=None):
+        with LeetcodeSession._session_file_lock:
+            jo = self._read_session_file()
+            entry = jo['sessions'].get(namespace or jo['active'])
+            if entry is None:
+                return
+            self._endpoint = entry['endpoint']
+            self._account = entry.get('account') or LC_DEFAULT_ACCOUNT
+            self._csrftoken = entry['csrftoken']
+            self._leetcode_session = entry['leetcode_session']
+            if jo.get('legacy'):
+                self._migrate_flat_layout()
+                self._write_session_file(jo)
+
+    def _migrate_flat_layout(self):
+        home = self._get_user_home()
+        for path in LC_LEGACY_PATHS:
+            src = (home + path).rstrip('/')
+            dst = self._get_path(path).rstrip('/')
+            if os.path.exists(src) and not os.path.exists(dst):
+                pathlib.Path(os.path.dirname(dst)).mkdir(parents=True, exist_ok=True)
+                shutil.move(src, dst)
 
     def is_logged_in(self):
         # todo
         # check login status by launching a request
         return self._endpoint is not None and self._csrftoken is not None and self._leetcode_session is not None
 
-    def login(self, endpoint, csrftoken, leetcode_session):
-        f = self._get_path(LC_SESSION)
-        with open(f, 'w') as outf:
-            jo = {
+    def login(self, endpoint, csrftoken, leetcode_session, account=None):
+        namespace = self.make_namespace(endpoint, account)
+        account = namespace.split('/', 1)[1]
+        with LeetcodeSession._session_file_lock:
+            jo = self._read_session_file()
+            jo['sessions'][namespace] = {
                 'endpoint': endpoint,
+                'account': account,
                 'csrftoken': csrftoken,
                 'leetcode_session': leetcode_session
             }
-            json.dump(jo, outf)
+            jo['active'] = namespace
+            self._write_session_file(jo)
         self._endpoint = endpoint
+        self._account = account
         self._csrftoken = csrftoken
         self._leetcode_session = leetcode_session
+        self._catalogue = None
+        self._ac_ids = None
+        self._stats = None
+        self._init_leetcode_home()
         self._init_api()
 
+    def activate(self):
+        with LeetcodeSession._session_file_lock:
+            jo = self._read_session_file()
+            if self.namespace() in jo['sessions']:
+                jo['active'] = self.namespace()
+                self._write_session_file(jo)
+
     def is_premium(self):
         pass
 
+    def is_offline(self):
+        return self._offline
+
+    def set_offline(self, offline):
+        self._offline = offline
+
+    def probe(self):
+        return self._api is not None and self._api.probe()
+
     def get_problems(self, category=LC_PROBLEM_ALL, use_cache=True):
         f = self._get_path(LC_PROBLEMS)
-        if use_cache and os.path.exists(f):
-            with open(f, 'r') as inf:
-                jo = json.load(inf)
-        else:
-            resp_text = self._api.get_problems(category)
-            with open(f, 'w') as outf:
+        if self._offline:
+            if not os.path.exists(f):
+                return None, 'No cached problem list, not available offline!'
+        elif not use_cache or not os.path.exists(f):
+            with RATE_LIMITER.priority(LC_PRIORITY_BACKGROUND):
+                resp_text = self._api.get_problems(category)
+            with TRACER.span('disk'), open(f, 'w') as outf:
                 outf.write(resp_text)
-            jo = json.loads(resp_text)
+            del resp_text
 
-        problems = jo['stat_status_pairs']
+        start = time.perf_counter()
+        problems = self._load_problem_records(f)
+        parse_ms = (time.perf_counter() - start) * 1000
         tmpf = self._get_path(LC_PROBLEMS_TMP)
 
-        ac_ids = []
-        acf = self._get_path(LC_ACLIST)
-        if os.path.exists(acf):
-            with open(acf, 'r') as inf:
-                ac_ids = list(map(str.strip, inf.readlines()))
+        ac_ids = self._read_ac_ids()
+        synced = []
+        total = {'total': 0, '1': 0, '2': 0, '3': 0}
+        solved = {'total': 0, '1': 0, '2': 0, '3': 0}
 
         def build_text(x):
-            qid = x['stat']['question_id']
-            title = x['stat']['question__title']
-            title_slug = x['stat']['question__title_slug']
-            level = x['difficulty']['level']
-            text = self._problem_repr_full(qid, title, level)
-            attrs = [('question_id', qid), ('title_slug', title_slug), ('level', level)]
-            if str(qid).strip() in ac_ids:
+            text = self._problem_repr_full(x.question_id, x.title, x.level)
+            attrs = [('question_id', x.question_id), ('title_slug', x.title_slug), ('level', x.level)]
+            level = str(x.level)
+            total['total'] += 1
+            total[level] += 1
+            ac = str(x.question_id) in ac_ids
+            if x.status == 'ac' and not ac:
+                synced.append(str(x.question_id))
+                ac = True
+            if ac:
                 attrs.append(('status', 'ac'))
+                solved['total'] += 1
+                solved[level] += 1
             return Line(text, attrs=attrs).__str__()
 
-        lines = list(map(build_text, sorted(problems, key=lambda x: x['stat']['question_id'])))
+        with TRACER.span('render'), open(tmpf, 'w') as outf:
+            for i, problem in enumerate(problems):
+                if i > 0:
+                    outf.write('\n')
+                outf.write(build_text(problem))
 
-        with open(tmpf, 'w') as outf:
-            outf.write('\n'.join(lines))
+        self._append_ac_ids(synced)
+        self._get_stats().record_catalogue(category, total, solved)
+
+        return tmpf, 'All problems loaded! (%d problems, parsed in %.0f ms)' % (len(problems), parse_ms)
+
+    def _load_problem_records(self, f):
+        st = os.stat(f)
+        key = (f, st.st_mtime_ns, st.st_size)
+        if self._catalogue is not None and self._catalogue[0] == key:
+            return self._catalogue[1]
+        with TRACER.span('json'), open(f, 'r') as inf:
+            records = sorted(_iter_problem_records(inf), key=lambda x: x.question_id)
+        self._catalogue = (key, records)
+        return records
 
-        return tmpf, 'All problems loaded!'
+    def _read_ac_ids(self):
+        acf = self._get_path(LC_ACLIST)
+        with self._ac_lock:
+            if not os.path.exists(acf):
+                self._ac_ids = None
+                return set()
+            st = os.stat(acf)
+            key = (acf, st.st_mtime_ns, st.st_size)
+            if self._ac_ids is None or self._ac_ids[0] != key:
+                with TRACER.span('disk'), open(acf, 'r') as inf:
+                    self._ac_ids = (key, set(filter(None, map(str.strip, inf))))
+            return self._ac_ids[1]
+
+    def _append_ac_ids(self, problem_ids):
+        with self._ac_lock:
+            ac_ids = self._read_ac_ids()
+            new_ids = [problem_id for problem_id in dict.fromkeys(problem_ids) if problem_id not in ac_ids]
+            if not new_ids:
+                return []
+            acf = self._get_path(LC_ACLIST)
+            with TRACER.span('disk'), open(acf, 'a') as outf:
+                outf.write(('\n' if outf.tell() > 0 else '') + '\n'.join(new_ids))
+            st = os.stat(acf)
+            self._ac_ids = ((acf, st.st_mtime_ns, st.st_size), ac_ids | set(new_ids))
+        return new_ids
+
+    def _get_stats(self):
+        f = self._get_path(LC_STATS)
+        if self._stats is None or self._stats[0] != f:
+            self._stats = (f, _ProgressStats(f))
+        return self._stats[1]
+
+    def get_dashboard(self):
+        return self._get_stats().render(self.namespace() or 'this session')
+
+    def _problem_lock(self, problem_id, title):
+        key = self._problem_repr_compact(problem_id, title)
+        with self._problem_locks_lock:
+            lock = self._problem_locks.get(key)
+            if lock is None:
+                lock = self._problem_locks[key] = threading.RLock()
+            return lock
+
+    @staticmethod
+    def _write_atomic(f, text):
+        tmpf = _tmp_path(f)
+        with TRACER.span('disk'), open(tmpf, 'w') as outf:
+            outf.write(text)
+        os.replace(tmpf, f)
 
     def _get_problem(self, problem_id, title, use_cache=True):
+        with self._problem_lock(problem_id, title):
+            return self._load_problem(problem_id, title, use_cache)
+
+    def _load_problem(self, problem_id, title, use_cache):
         f = self._get_path(LC_PROBLEMS_HOME) + self._problem_repr_compact(problem_id, title) + '.json'
-        if use_cache and os.path.exists(f):
-            with open(f, 'r') as inf:
-                jo = json.load(inf)
+        if (use_cache or self._offline) and os.path.exists(f):
+            with TRACER.span('disk'), open(f, 'r') as inf:
+                resp_text = inf.read()
+        elif self._offline:
+            raise LeetcodeOfflineError('Problem %s is not cached, not available offline!' % title)
         else:
             resp_text = self._api.graphql_question_data(title)
-            with open(f, 'w') as outf:
-                outf.write(resp_text)
+            self._write_atomic(f, resp_text)
+        with TRACER.span('json'):
             jo = json.loads(resp_text)
         return jo
 
     def get_problem_code(self, problem_id, title, lang, use_cache=True):
+        with self._problem_lock(problem_id, title):
+            return self._build_problem_code(problem_id, title, lang, use_cache)
+
+    def prefetch(self, problem_id, title, lang):
+        if self._offline or not self.is_logged_in():
+            return
+        with RATE_LIMITER.priority(LC_PRIORITY_BACKGROUND):
+            self.get_problem_code(problem_id, title, lang, True)
+
+    def prefetch_question(self, problem_id, title):
+        if self._offline or not self.is_logged_in():
+            return False
+        with RATE_LIMITER.priority(LC_PRIORITY_BACKGROUND):
+            self._get_problem(problem_id, title)
+        return True
+
+    def _build_problem_code(self, problem_id, title, lang, use_cache):
         f = self._get_path(LC_SOLUTIONS_HOME) + lang + '/' \
             + self._problem_repr_compact(problem_id, title) \
             + EXTENSIONS[lang]
         if use_cache and os.path.exists(f):
             return f, 'Happy coding! ^_^'
         self._init_lang_dir(lang, path=self._get_path(LC_SOLUTIONS_HOME))
-        jo = self._get_problem(problem_id, title)
+        try:
+            jo = self._get_problem(problem_id, title)
+        except LeetcodeOfflineError as e:
+            return None, str(e)
         if jo['data']['question']['status'] == 'ac':
-            self._update_ac_list(problem_id)
-        lines = self._html2text(jo['data']['question']['content']).split('\n')
+            self._update_ac_list(problem_id, title, jo)
+        lines = list(self.render_description(jo['data']['question']['content']))
         comment = COMMENTS[lang]
         lines.insert(0, '@desc-start')
         lines.append('@desc-end')
@@ -308,16 +1263,53 @@ class LeetcodeSession:
         code_data = filter(lambda x: x['langSlug'] == lang, jo['data']['question']['codeSnippets'])
         code_lines = ['', '', comment + ' @code-start'] + list(list(code_data)[0]['code'].split('\n'))
         code_lines.append(comment + ' @code-end')
-        with open(f, 'w') as outf:
-            outf.write('\n'.join(lines + code_lines))
+        self._write_atomic(f, '\n'.join(lines + code_lines))
         return f, 'Happy coding! ^_^'
 
+    def render_description(self, content):
+        key = hashlib.sha1((content or '').encode('utf-8')).hexdigest()
+        with self._rendered_lock:
+            lines = self._rendered.get(key)
+            if lines is not None:
+                self._rendered.move_to_end(key)
+                return lines
+        f = self._get_path(LC_PREVIEW_HOME) + key + '.txt'
+        if os.path.exists(f):
+            with TRACER.span('disk'), open(f, 'r') as inf:
+                text = inf.read()
+        else:
+            text = self._html2text(content or '')
+            self._write_atomic(f, text)
+        lines = tuple(text.split('\n'))
+        with self._rendered_lock:
+            self._rendered[key] = lines
+            while len(self._rendered) > LC_PREVIEW_CACHE_SIZE:
+                self._rendered.popitem(last=False)
+        return lines
+
+    def get_preview(self, problem_id, title):
+        f = self._get_path(LC_PROBLEMS_HOME) + self._problem_repr_compact(problem_id, title) + '.json'
+        if not os.path.exists(f):
+            return None
+        jo = self._get_problem(problem_id, title)
+        question = jo['data']['question']
+        header = ['%s. %s [%s]' % (int(problem_id), question.get('title') or title, question.get('difficulty')), '']
+        return header + list(self.render_description(question['content']))
+
     @staticmethod
     def _cut_codes(code_lines):
         start_index = LeetcodeSession._find_index(code_lines, '@code-start')
         end_index = LeetcodeSession._find_index(code_lines, '@code-end')
         return code_lines[start_index + 1: end_index]
 
+    @staticmethod
+    def _splice_codes(file_lines, code_lines):
+        start_index = LeetcodeSession._find_index(file_lines, '@code-start')
+        end_index = LeetcodeSession._find_index(file_lines, '@code-end')
+        if start_index is None or end_index is None or end_index < start_index:
+            return list(code_lines)
+        return file_lines[:start_index + 1] + list(code_lines) + file_lines[end_index:]
+
     @staticmethod
     def _find_index(code_lines, delimiter):
         for i in range(len(code_lines)):
@@ -370,46 +1362,131 @@ class LeetcodeSession:
             else:
                 return status_msg
 
-    def test(self, problem_id, title, lang, testcases):
-        f = self._get_path(LC_SOLUTIONS_HOME) + lang + '/' \
-            + self._problem_repr_compact(problem_id, title) \
-            + EXTENSIONS[lang]
+    def test_code(self, problem_id, title, lang, code_lines, testcases, cancel=None):
+        if self._offline:
+            return self._queue_outbox('test', problem_id, title, lang, code_lines, testcases), None
+        return self._run_test(problem_id, title, lang, code_lines, testcases, cancel)
+
+    def _run_test(self, problem_id, title, lang, code_lines, testcases, cancel=None):
         if not testcases:
             jo = self._get_problem(problem_id, title)
             testcases = jo['data']['question']['sampleTestCase']
-        with open(f, 'r') as inf:
-            code_lines = inf.readlines()
-        jo = self._api.test(problem_id, title, lang, self._cut_codes(code_lines), testcases)
-        return self._build_test_code_output(jo, testcases)
+        jo = self._api.test(problem_id, title, lang, code_lines, testcases, cancel)
+        if cancel is not None and cancel.is_set():
+            return None, None
+        if jo is None:
+            return 'Judge timed out, please try again!', None
+        return self._build_test_code_output(jo, testcases), jo
+
+    def _update_ac_list(self, problem_id, title=None, jo=None, accepted=False):
+        new = self._append_ac_ids([str(int(problem_id))])
+        if not (new or accepted):
+            return False
+        level = None
+        try:
+            if jo is None and title is not None:
+                jo = self._get_problem(problem_id, title)
+            if jo is not None:
+                level = DIFFICULTIES.get(jo['data']['question']['difficulty'])
+        except (RuntimeError, requests.RequestException, KeyError, TypeError):
+            pass
+        if accepted:
+            self._get_stats().record_ac(problem_id, title or str(problem_id), level, new=new)
+        else:
+            self._get_stats().record_sync(level)
+        return new
 
-    def _update_ac_list(self, problem_id):
-        f = self._get_path(LC_ACLIST)
-        ac_ids = []
-        if os.path.exists(f):
-            with open(f, 'r') as inf:
-                ac_ids = list(map(str.strip, inf.readlines()))
-        ac_ids.append(str(int(problem_id)))
-        with open(f, 'w') as outf:
-            outf.write('\n'.join(ac_ids))
+    def submit_code(self, problem_id, title, lang, code_lines):
+        if self._offline:
+            return self._queue_outbox('submit', problem_id, title, lang, code_lines), None
+        return self._run_submit(problem_id, title, lang, code_lines)
 
-    def submit(self, problem_id, title, lang):
+    def _run_submit(self, problem_id, title, lang, code_lines):
         fn = self._problem_repr_compact(problem_id, title) + EXTENSIONS[lang]
         fp = self._get_path(LC_SOLUTIONS_HOME) + lang + '/' + fn
-        with open(fp, 'r') as inf:
-            code_lines = inf.readlines()
-            code_lines = list(map(lambda x: x.rstrip(), code_lines))
-        jo = self._api.submit(problem_id, title, lang, self._cut_codes(code_lines))
+        jo = self._api.submit(problem_id, title, lang, code_lines)
+        if jo is None:
+            return 'Judge timed out, please try again!', None
         if jo.get('run_success') is not None \
-                and jo['total_correct'] == jo['total_testcases'] \
-                and self.has_repo_path():
-            self._init_lang_dir(lang, self._repo_solution_dir)
-            shutil.copyfile(fp, self._repo_solution_dir + lang + '/' + fn)
+                and jo['total_correct'] == jo['total_testcases']:
+            if self.has_repo_path():
+                self._init_lang_dir(lang, self._repo_solution_dir)
+                file_lines = []
+                if os.path.exists(fp):
+                    with TRACER.span('disk'), open(fp, 'r') as inf:
+                        file_lines = [line.rstrip('\n') for line in inf]
+                self._write_atomic(self._repo_solution_dir + lang + '/' + fn,
+                                   '\n'.join(self._splice_codes(file_lines, code_lines)) + '\n')
             self.play_ringtone('pass_ringtone')
-            self._update_ac_list(problem_id)
-        return self._build_submit_code_output(jo)
+            self._update_ac_list(problem_id, title, accepted=True)
+        return self._build_submit_code_output(jo), jo
+
+    def _read_outbox(self):
+        f = self._get_path(LC_OUTBOX)
+        if not os.path.exists(f):
+            return []
+        with open(f, 'r') as inf:
+            return json.load(inf)
+
+    def _write_outbox(self, entries):
+        f = self._get_path(LC_OUTBOX)
+        tmpf = _tmp_path(f)
+        with open(tmpf, 'w') as outf:
+            json.dump(entries, outf)
+        os.replace(tmpf, f)
+
+    def _queue_outbox(self, kind, problem_id, title, lang, code_lines, testcases=None):
+        with self._outbox_lock:
+            entries = self._read_outbox()
+            entries.append({
+                'kind': kind,
+                'problem_id': str(problem_id),
+                'title': title,
+                'lang': lang,
+                'code_lines': list(code_lines),
+                'testcases': testcases,
+                'queued_at': time.time()
+            })
+            self._write_outbox(entries)
+        return 'Offline, %s queued! (%d pending)' % (kind, len(entries))
+
+    def outbox_size(self):
+        with self._outbox_lock:
+            return len(self._read_outbox())
+
+    def flush_outbox(self):
+        results = []
+        with self._outbox_lock:
+            entries = self._read_outbox()
+            while entries:
+                entry = entries[0]
+                name = self._problem_repr_compact(entry['problem_id'], entry['title']) + EXTENSIONS[entry['lang']]
+                try:
+                    if entry['kind'] == 'test':
+                        msg, _ = self._run_test(entry['problem_id'], entry['title'], entry['lang'],
+                                                entry['code_lines'], entry['testcases'])
+                    else:
+                        msg, _ = self._run_submit(entry['problem_id'], entry['title'], entry['lang'],
+                                                  entry['code_lines'])
+                except requests.RequestException:
+                    break
+                except LeetcodeHttpError as e:
+                    if e.status_code in LC_RETRY_STATUS:
+                        break
+                    msg = 'Request failed: %s' % e
+                except RuntimeError as e:
+                    msg = 'Request failed: %s' % e
+                results.append('[%s] %s\n%s' % (entry['kind'], name, msg))
+                entries.pop(0)
+                self._write_outbox(entries)
+        return results, len(entries)
 
     def get_last_submission(self, problem_id, title, lang):
-        f, _ = self.get_problem_code(problem_id, title, lang, True)
+        f, msg = self.get_problem_code(problem_id, title, lang, True)
+        if f is None:
+            return f, msg
+        if self._offline:
+            return f, 'Not available offline!'
         with open(f, 'r') as inf:
             code_lines = inf.readlines()
             code_lines = list(map(lambda x: x.rstrip(), code_lines))
@@ -426,27 +1503,167 @@ class LeetcodeSession:
         else:
             return f, 'Latest submission is retrieved!'
 
+    def _cached_json(self, f, fetch, ttl=None, use_cache=True):
+        if use_cache and os.path.exists(f):
+            fresh = ttl is None or time.time() - os.path.getmtime(f) < ttl
+            if fresh or self._offline:
+                with TRACER.span('disk'), open(f, 'r') as inf:
+                    return json.load(inf)
+        if self._offline:
+            raise LeetcodeOfflineError('Not cached, not available offline!')
+        try:
+            resp_text = fetch()
+        except requests.RequestException:
+            if not os.path.exists(f):
+                raise
+            with TRACER.span('disk'), open(f, 'r') as inf:
+                return json.load(inf)
+        self._write_atomic(f, resp_text)
+        with TRACER.span('json'):
+            return json.loads(resp_text)
+
+    def _submissions_page_path(self, problem_id, title, page):
+        return self._get_path(LC_SUBMISSIONS_HOME) + self._problem_repr_compact(problem_id, title) \
+            + '.page-%d.json' % page
+
+    def get_submissions_page(self, problem_id, title, page, use_cache=True, lastkey=''):
+        if page > 0 and not lastkey:
+            previous = self.get_submissions_page(problem_id, title, page - 1, True)
+            if not previous.get('has_next'):
+                return {'submissions_dump': [], 'has_next': False}
+            lastkey = previous.get('last_key') or ''
+        return self._cached_json(
+            self._submissions_page_path(problem_id, title, page),
+            lambda: self._api.get_submissions(title, page * LC_SUBMISSIONS_PAGE_SIZE,
+                                              LC_SUBMISSIONS_PAGE_SIZE, lastkey),
+            ttl=self.get_config('submissions_ttl') or LC_SUBMISSIONS_TTL,
+            use_cache=use_cache)
+
+    def get_submission_detail(self, submission_id):
+        f = self._get_path(LC_SUBMISSIONS_HOME) + 'detail-%s.json' % submission_id
+        try:
+            return self._cached_json(f, lambda: self._api.get_submission_check(submission_id))
+        except (RuntimeError, requests.RequestException):
+            return {}
+
+    def get_submission_code(self, problem_id, title, page, submission_id):
+        jo = self.get_submissions_page(problem_id, title, page, True)
+        submission = next((x for x in jo.get('submissions_dump', []) if str(x['id']) == str(submission_id)), None)
+        if submission is None:
+            raise RuntimeError('Submission %s is not on page %d any more, reload the list with LCSubmissions(\'refresh\')!'
+                               % (submission_id, page + 1))
+        lang = submission['lang']
+        comment = COMMENTS.get(lang, '//')
+        detail = self.get_submission_detail(submission['id'])
+        header = ['Submission %s, %s, %s' % (submission['id'], submission.get('status_display'), submission.get('time')),
+                  'Runtime: %s, Memory: %s' % (submission.get('runtime'), submission.get('memory'))]
+        if detail.get('runtime_percentile') is not None:
+            header.append('Runtime Percentile: %02.2f, Memory Percentile: %02.2f'
+                          % (detail['runtime_percentile'], detail.get('memory_percentile') or 0))
+        f = self._get_path(LC_SUBMISSIONS_HOME) + self._problem_repr_compact(problem_id, title) \
+            + '.%s' % submission['id'] + EXTENSIONS.get(lang, '.txt')
+        with TRACER.span('disk'), open(f, 'w') as outf:
+            outf.write('\n'.join(list(map(lambda x: comment + ' ' + x, header)) + [''] + submission['code'].split('\n')))
+        return f
+
     @staticmethod
     def _html2text(html):
-        soup = BeautifulSoup(html, 'html.parser')
-        return soup.text
+        with TRACER.span('html2text'):
+            soup = BeautifulSoup(html, 'html.parser')
+            return soup.text
 
     def get_cards(self, category):
-        tmpf = self._get_path(LC_PROBLEMS_TMP)
-        jo = json.loads(self._api.graphql_get_categories())
-        cards = list(filter(lambda x: x['slug'] == category, jo['data']['categories']))[0]['cards']
+        tmpf = self._get_path(LC_CARDS_TMP)
+        try:
+            categories = self.get_explore_categories()
+        except LeetcodeOfflineError as e:
+            return None, str(e)
+        cards = list(filter(lambda x: x['slug'] == category, categories))[0]['cards']
         lines = list(map(lambda x: x['title'], cards))
         with open(tmpf, 'w') as outf:
             outf.write('\n'.join(lines))
         return tmpf, 'All cards loaded'
 
+    def _explore_ttl(self):
+        return self.get_config('explore_ttl') or LC_EXPLORE_TTL
+
+    def get_explore_categories(self, use_cache=True):
+        jo = self._cached_json(self._get_path(LC_EXPLORE_HOME) + 'categories.json',
+                               lambda: self._api.graphql_get_categories(),
+                               ttl=self._explore_ttl(), use_cache=use_cache)
+        return jo['data']['categories']
+
+    def get_explore_chapters(self, category, card_slug):
+        jo = self._cached_json(self._get_path(LC_EXPLORE_HOME) + 'card-%s.json' % card_slug,
+                               lambda: self._api.graphql_get_chapters(category, card_slug),
+                               ttl=self._explore_ttl())
+        return jo['data']['chapters'] or []
+
+    def get_explore_chapter(self, category, card_slug, chapter_id):
+        jo = self._cached_json(self._get_path(LC_EXPLORE_HOME) + 'chapter-%s.json' % chapter_id,
+                               lambda: self._api.graphql_get_chapter(category, card_slug, chapter_id),
+                               ttl=self._explore_ttl())
+        return jo['data']['chapter']['items'] or []
+
+    def get_explore_item(self, item_id):
+        jo = self._cached_json(self._get_path(LC_EXPLORE_HOME) + 'item-%s.json' % item_id,
+                               lambda: self._api.graphql_get_item(item_id))
+        return jo['data']['item']
+
+    def get_explore_item_code(self, item_id, lang):
+        item = self.get_explore_item(item_id)
+        question = item.get('question') if item else None
+        if not question:
+            return None, 'Only question items can be opened!'
+        return self.get_problem_code(question['questionId'], question['titleSlug'], lang, True)
+
+    def get_contest(self, contest_slug, use_cache=True):
+        f = self._get_path(LC_CONTESTS_HOME) + contest_slug + '.json'
+        if use_cache and os.path.exists(f):
+            with TRACER.span('disk'), open(f, 'r') as inf:
+                return json.load(inf)
+        if self._offline:
+            raise LeetcodeOfflineError('Contest %s is not cached, not available offline!' % contest_slug)
+        resp_text = self._api.get_contest_info(contest_slug)
+        with TRACER.span('json'):
+            jo = json.loads(resp_text)
+        if jo.get('questions'):
+            self._write_atomic(f, resp_text)
+        return jo
+
+    def warm_up(self, connections=LC_POOL_SIZE):
+        if not self._offline and self._api is not None:
+            self._api.warm_up(connections)
+
+    def _try_problem_code(self, problem_id, title, lang):
+        try:
+            return self.get_problem_code(problem_id, title, lang, True)
+        except IndexError:
+            return None, 'Failed to load %s: no %s code snippet' % (title, lang)
+        except (RuntimeError, requests.RequestException, KeyError, TypeError) as e:
+            return None, 'Failed to load %s: %s' % (title, e)
+
+    def prepare_contest(self, contest_slug, lang):
+        jo = self.get_contest(contest_slug)
+        questions = jo.get('questions') or []
+        if not questions:
+            return None, jo
+        with concurrent.futures.ThreadPoolExecutor(len(questions), 'leetcode-contest') as executor:
+            futures = [executor.submit(self._try_problem_code, q['question_id'], q['title_slug'], lang)
+                       for q in questions]
+            return [future.result() for future in futures], jo
+
 
 class _LeetcodeApi:
 
-    def __init__(self, endpoint, csrftoken, leetcode_session):
+    def __init__(self, endpoint, csrftoken, leetcode_session, base_url=None,
+                 poll_interval=LC_POLL_INTERVAL, poll_timeout=LC_POLL_TIMEOUT):
         self._endpoint = endpoint
         self._csrftoken = csrftoken
         self._leetcode_session = leetcode_session
+        self._base_url = base_url.rstrip('/') if base_url else None
+        self._poll_interval = poll_interval
+        self._poll_timeout = poll_timeout
 
     def _host(self):
         if self._endpoint == 'cn':
@@ -455,14 +1672,62 @@ class _LeetcodeApi:
             return LC_ENDPOINT_US
 
     def _url(self, name, *varargs):
-        return URLS[name] % (self._host(), *varargs)
+        url = URLS[name] % (self._host(), *varargs)
+        if self._base_url:
+            url = self._base_url + url[len('https://' + self._host()):]
+        return url
+
+    def probe(self):
+        try:
+            resp = HTTP.get(self._url('home'), timeout=LC_PROBE_TIMEOUT)
+        except requests.RequestException:
+            return False
+        return resp.status_code < 500
 
     @staticmethod
     def check_resp(resp, status_code=200, ex_msg='failed to get expected response'):
         if resp:
             if status_code == resp.status_code:
                 return resp
-        raise RuntimeError(ex_msg)
+        raise LeetcodeHttpError(ex_msg, resp.status_code if resp is not None else None)
+
+    @staticmethod
+    def _parse_retry_after(value):
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _request(method, url, headers, params=None, form_data=None, status_code=200):
+        retries = LC_MAX_RETRIES if method == 'GET' else 0
+        host = urllib.parse.urlsplit(url).netloc
+        attempt = 0
+        while True:
+            with TRACER.span('ratelimit'):
+                RATE_LIMITER.acquire(host)
+            with TRACER.span('http'):
+                resp = HTTP.request(method, url, headers=headers, params=params, json=form_data)
+            if resp.status_code not in LC_RETRY_STATUS:
+                return _LeetcodeApi.check_resp(resp, status_code)
+            retry_after = _LeetcodeApi._parse_retry_after(resp.headers.get('Retry-After'))
+            backoff = LC_RETRY_BACKOFF * (2 ** attempt)
+            if retry_after is not None:
+                RATE_LIMITER.pause(host, retry_after)
+            elif resp.status_code == 429:
+                RATE_LIMITER.pause(host, backoff)
+            if attempt >= retries:
+                raise LeetcodeHttpError('%s %s failed with status %d' % (method, url, resp.status_code),
+                                        resp.status_code, retry_after)
+            attempt += 1
+            if retry_after is None and resp.status_code != 429:
+                time.sleep(backoff)
 
     def _build_cookie_string(self):
         return 'csrftoken=' + self._csrftoken + ';' + 'LEETCODE_SESSION=' + self._leetcode_session + ';'
@@ -479,13 +1744,11 @@ class _LeetcodeApi:
     def _do_get(url, headers, params=None, status_code=200):
         if params is None:
             params = {}
-        resp = requests.get(url, headers=headers, params=params)
-        return _LeetcodeApi.check_resp(resp, status_code)
+        return _LeetcodeApi._request('GET', url, headers, params=params, status_code=status_code)
 
     @staticmethod
     def _do_post(url, headers, form_data, status_code=200):
-        resp = requests.post(url, headers=headers, json=form_data)
-        return _LeetcodeApi.check_resp(resp, status_code)
+        return _LeetcodeApi._request('POST', url, headers, form_data=form_data, status_code=status_code)
 
     def get_progress_all(self):
         url = self._url('progress_all')
@@ -639,7 +1902,7 @@ class _LeetcodeApi:
         })
         return resp.text
 
-    def graphql_get_chapter(self, category, card_slug):
+    def graphql_get_chapter(self, category, card_slug, chapter_id=None):
         url = self._url('graphql')
         resp = self._do_post(url, headers={
             **self._build_headers(),
@@ -647,6 +1910,7 @@ class _LeetcodeApi:
         }, form_data={
             'operationName': 'GetChapter',
             'variables': {
+                'chapterId': chapter_id,
                 'cardSlug': card_slug
             },
             'query': 'query GetChapter($chapterId: String, $cardSlug: String) {'
@@ -794,7 +2058,7 @@ class _LeetcodeApi:
         })
         return resp.text
 
-    def _upload_code(self, url_name, run_id_name, title, form_data):
+    def _upload_code(self, url_name, run_id_name, title, form_data, cancel=None):
         url = self._url(url_name, title)
         resp = self._do_post(url, headers={
             **self._build_headers(),
@@ -803,27 +2067,31 @@ class _LeetcodeApi:
         jo = resp.json()
         run_id = jo[run_id_name]
         url = self._url('run_check', run_id)
-        total_rounds = 30  # 30 seconds
-        round_index = 0
+        deadline = time.monotonic() + self._poll_timeout
         final_resp_json = None
-        while round_index < total_rounds:
-            resp = _LeetcodeApi._do_get(url, headers=self._build_headers())
-            resp_json = resp.json()
-            if resp_json['state'] == 'SUCCESS':
-                final_resp_json = resp.json()
-                break
-            time.sleep(1)
-            round_index += 1
+        with TRACER.span('poll'):
+            while time.monotonic() < deadline:
+                if cancel is not None and cancel.is_set():
+                    break
+                resp = _LeetcodeApi._do_get(url, headers=self._build_headers())
+                resp_json = resp.json()
+                if resp_json['state'] == 'SUCCESS':
+                    final_resp_json = resp_json
+                    break
+                if cancel is not None:
+                    cancel.wait(self._poll_interval)
+                else:
+                    time.sleep(self._poll_interval)
         return final_resp_json
 
-    def test(self, problem_id, title, lang, code_lines, testcases):
+    def test(self, problem_id, title, lang, code_lines, testcases, cancel=None):
         return self._upload_code('run', 'interpret_id', title, form_data={
             'data_input': testcases,
             'judge_type': 'large',
             'lang': lang,
             'question_id': int(problem_id),
             'typed_code': '\n'.join(code_lines)
-        })
+        }, cancel=cancel)
 
     def submit(self, problem_id, title, lang, code_lines):
         return self._upload_code('submit', 'submission_id', title, form_data={
@@ -832,6 +2100,46 @@ class _LeetcodeApi:
             'typed_code': '\n'.join(code_lines)
         })
 
+    def get_submissions(self, title, offset, limit, lastkey):
+        url = self._url('submissions', title)
+        resp = _LeetcodeApi._do_get(url, headers={
+            **self._build_headers(),
+            'Referer': self._url('referer', title)
+        }, params={
+            'offset': offset,
+            'limit': limit,
+            'lastkey': lastkey
+        })
+        return resp.text
+
+    def get_contest_info(self, contest_slug):
+        url = self._url('contest_info', contest_slug)
+        resp = _LeetcodeApi._do_get(url, headers={
+            **self._build_headers(),
+            'Referer': self._url('contest', contest_slug)
+        })
+        return resp.text
+
+    def warm_up(self, connections):
+        url = self._url('home')
+
+        def touch():
+            try:
+                HTTP.head(url, timeout=LC_PROBE_TIMEOUT)
+            except requests.RequestException:
+                pass
+
+        threads = [threading.Thread(target=touch, name='leetcode-warm-up') for _ in range(connections)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+    def get_submission_check(self, submission_id):
+        url = self._url('run_check', submission_id)
+        resp = _LeetcodeApi._do_get(url, headers=self._build_headers())
+        return resp.text
+
     def get_last_submission(self, problem_id, title, lang):
         url = self._url('latest_submission')
         resp = _LeetcodeApi._do_get(url, headers={
@@ -874,16 +2182,465 @@ class LeetcodePlugin(object):
                 configs['pass_ringtone'] = ringtone
 
         self._send_ringtone = None
+        if self.vim.vars.get('leetcode_base_url'):
+            base_url = self.vim.eval('g:leetcode_base_url')
+            if base_url:
+                configs['base_url'] = base_url
+
+        configs['offline'] = bool(self.vim.vars.get('leetcode_offline', 0))
+
+        if self.vim.vars.get('leetcode_explore_ttl'):
+            configs['explore_ttl'] = int(self.vim.vars.get('leetcode_explore_ttl'))
+
+        if self.vim.vars.get('leetcode_submissions_ttl'):
+            configs['submissions_ttl'] = int(self.vim.vars.get('leetcode_submissions_ttl'))
+
+        if self.vim.vars.get('leetcode_poll_interval'):
+            configs['poll_interval'] = float(self.vim.vars.get('leetcode_poll_interval'))
+
+        if self.vim.vars.get('leetcode_poll_timeout'):
+            configs['poll_timeout'] = float(self.vim.vars.get('leetcode_poll_timeout'))
+
         if self.vim.vars.get('leetcode_send_ringtone'):
             ringtone = self.vim.eval('g:leetcode_send_ringtone')
             if ringtone:
                 configs['send_ringtone'] = ringtone
 
+        trace_enabled = bool(self.vim.vars.get('leetcode_trace'))
+        trace_file = None
+        if self.vim.vars.get('leetcode_trace_file'):
+            trace_file = self.vim.eval('g:leetcode_trace_file')
+        TRACER.configure(trace_enabled, trace_file, self.vim.vars.get('leetcode_trace_window'))
+
+        self._save_before_judge = bool(self.vim.vars.get('leetcode_save_before_judge', 1))
+        self._marks_ns = None
+        self._code_marks = {}
+
+        self._auto_test = bool(self.vim.vars.get('leetcode_auto_test', 0))
+        auto_test_delay = int(self.vim.vars.get('leetcode_auto_test_delay', 800))
+        self._auto_test_debouncer = _Debouncer(auto_test_delay / 1000.0, self._on_auto_test_timer)
+        self._runs = {}
+        self._runs_lock = threading.Lock()
+        self._own_writes = set()
+
+        RATE_LIMITER.configure(self.vim.vars.get('leetcode_rate_limit', LC_RATE_LIMIT),
+                               self.vim.vars.get('leetcode_rate_burst', LC_RATE_BURST))
+
+        self._prefetch = bool(self.vim.vars.get('leetcode_prefetch', 1))
+        self._prefetch_neighbours = bool(self.vim.vars.get('leetcode_prefetch_neighbours', 1))
+        prefetch_delay = int(self.vim.vars.get('leetcode_prefetch_delay', 300))
+        self._prefetch_debouncer = _Debouncer(prefetch_delay / 1000.0, self._on_prefetch_timer)
+        self._prefetch_worker = _Worker('leetcode-prefetch', maxsize=8)
+
+        self._result_window = bool(self.vim.vars.get('leetcode_result_window', 1))
+        self._result_max_lines = int(self.vim.vars.get('leetcode_result_max_lines', LC_RESULT_MAX_LINES))
+        self._result_ns = None
+
+        self._preview_buf = None
+        self._preview_key = None
+        self._preview_lines = []
+        self._preview_wanted = None
+        self._preview_debouncer = _Debouncer(0.08, self._on_preview_timer)
+
+        self._probe_interval = int(self.vim.vars.get('leetcode_offline_probe', 30))
+        self._probe_timer = None
+
+        self._contest_timers = []
+
+        self._configs = configs
         self.session = LeetcodeSession(configs)
+        self.sessions = {self.session.namespace(): self.session}
+        for namespace in LeetcodeSession.get_namespaces()[1]:
+            if namespace not in self.sessions:
+                self.sessions[namespace] = LeetcodeSession(configs, namespace)
+        if self.session.is_offline():
+            self._schedule_probe()
+
+    def _session_for(self, path):
+        if path:
+            if path in self.sessions:
+                return self.sessions[path]
+            matched = [s for s in self.sessions.values()
+                       if s.namespace() is not None and path.startswith(s.get_namespace_dir())]
+            if matched:
+                return max(matched, key=lambda s: len(s.get_namespace_dir()))
+        return self.session
 
     def _echo(self, message):
         message = message.replace('\"', '')
-        self.vim.command('echo "' + message + '"')
+        with TRACER.span('rpc'):
+            self.vim.command('echo "' + message + '"')
+
+    def _edit(self, f):
+        with TRACER.span('rpc'):
+            self.vim.command('e ' + f)
+
+    def _open_scratch(self, name, lines, split=None):
+        name = LC_SCRATCH_PREFIX + name
+        with TRACER.span('rpc'):
+            bufnr = self.vim.funcs.bufnr(name)
+            if bufnr > 0:
+                winnr = self.vim.funcs.bufwinnr(bufnr)
+                if winnr > 0:
+                    self.vim.command('%dwincmd w' % winnr)
+                elif split:
+                    self.vim.command('%s | buffer %d' % (split, bufnr))
+                else:
+                    self.vim.command('buffer %d' % bufnr)
+            else:
+                self.vim.command(split + ' | enew' if split else 'enew')
+                self.vim.command('setlocal buftype=nofile bufhidden=hide noswapfile')
+                self.vim.command('file ' + self.vim.funcs.fnameescape(name))
+            buf = self.vim.current.buffer
+            buf.options['modifiable'] = True
+            self.vim.api.buf_set_lines(buf, 0, -1, False, lines)
+            buf.options['modifiable'] = False
+        return buf
+
+    def _append_scratch(self, buf, lines, replace_last=False):
+        with TRACER.span('rpc'):
+            buf.options['modifiable'] = True
+            self.vim.api.buf_set_lines(buf, -2 if replace_last else -1, -1, False, lines)
+            buf.options['modifiable'] = False
+
+    @staticmethod
+    def _first_mismatch(expected, actual):
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            if e != a:
+                return i
+        if len(expected) != len(actual):
+            return min(len(expected), len(actual))
+        return None
+
+    @staticmethod
+    def _clip_lines(lines, max_lines, focus=None):
+        start = 0
+        if focus is not None and focus >= max_lines:
+            start = focus - max_lines // 2
+        end = min(len(lines), start + max_lines)
+        clipped = []
+        if start > 0:
+            clipped.append('... %d lines skipped' % start)
+        for line in lines[start:end]:
+            if len(line) > LC_RESULT_MAX_COLUMNS:
+                line = line[:LC_RESULT_MAX_COLUMNS] + ' ... (%d more chars)' % (len(line) - LC_RESULT_MAX_COLUMNS)
+            clipped.append(line)
+        if end < len(lines):
+            clipped.append('... %d more lines' % (len(lines) - end))
+        return clipped, start - (1 if start > 0 else 0)
+
+    @staticmethod
+    def _split_output(output):
+        if output is None:
+            return []
+        if isinstance(output, list):
+            lines = []
+            for x in output:
+                lines.extend(str(x).split('\n'))
+            return lines
+        return str(output).split('\n')
+
+    @staticmethod
+    def _build_result_view(msg, jo, max_lines=LC_RESULT_MAX_LINES):
+        expected = actual = None
+        if jo is not None and jo.get('run_success'):
+            if 'expected_code_answer' in jo or 'code_answer' in jo:
+                expected = LeetcodePlugin._split_output(jo.get('expected_code_answer'))
+                actual = LeetcodePlugin._split_output(jo.get('code_answer'))
+            elif jo.get('total_correct') != jo.get('total_testcases'):
+                expected = LeetcodePlugin._split_output(jo.get('expected_output'))
+                actual = LeetcodePlugin._split_output(jo.get('code_output'))
+        if expected is None or '\nExpected Output:\n' not in msg:
+            lines, _ = LeetcodePlugin._clip_lines(msg.split('\n'), max_lines)
+            return lines, []
+        head = msg.split('\nExpected Output:\n', 1)[0]
+        lines, _ = LeetcodePlugin._clip_lines(head.split('\n'), max_lines)
+        mismatch = LeetcodePlugin._first_mismatch(expected, actual)
+        highlights = []
+        for name, output, group in (('Expected Output', expected, 'DiffAdd'), ('Output', actual, 'DiffDelete')):
+            lines.append('%s: (%d lines)' % (name, len(output)))
+            clipped, offset = LeetcodePlugin._clip_lines(output, max_lines, mismatch)
+            if mismatch is not None and 0 <= mismatch - offset < len(clipped):
+                highlights.append((len(lines) + mismatch - offset, group))
+            lines.extend(clipped)
+        if mismatch is not None:
+            lines.append('First mismatch at line %d' % (mismatch + 1))
+        return lines, highlights
+
+    def _show_result(self, msg, jo):
+        if not self._result_window:
+            self._echo(msg)
+            return
+        lines, highlights = self._build_result_view(msg, jo, self._result_max_lines)
+        win = self.vim.current.window
+        buf = self._open_scratch('result', lines, split='botright 12split')
+        with TRACER.span('rpc'):
+            if self._result_ns is None:
+                self._result_ns = self.vim.api.create_namespace('leetcode_result')
+            self.vim.api.buf_clear_namespace(buf, self._result_ns, 0, -1)
+            status = lines[0] if lines else ''
+            group = 'DiffAdd' if status in ('Accepted', 'Correct') else 'ErrorMsg'
+            self.vim.api.buf_add_highlight(buf, self._result_ns, group, 0, 0, -1)
+            for row, group in highlights:
+                self.vim.api.buf_add_highlight(buf, self._result_ns, group, row, 0, -1)
+            if highlights:
+                self.vim.api.win_set_cursor(self.vim.current.window, [highlights[-1][0] + 1, 0])
+            self.vim.current.window = win
+        self._echo(status)
+
+    def _problem_under_cursor(self):
+        buf_name = self.vim.current.buffer.name
+        buf_name = buf_name.split('/')[-1]
+        current_line = self.vim.current.line
+        problem_id, title, ext = LeetcodePlugin.extract_data_from_line(current_line)
+        if problem_id is None:
+            problem_id, title, ext = LeetcodePlugin.extract_data_from_line(buf_name)
+        return problem_id, title, ext
+
+    def _scan_code_marks(self, buf):
+        with TRACER.span('rpc'):
+            lines = self.vim.api.buf_get_lines(buf, 0, -1, False)
+        start_index = LeetcodeSession._find_index(lines, '@code-start')
+        end_index = LeetcodeSession._find_index(lines, '@code-end')
+        if start_index is None or end_index is None or end_index <= start_index:
+            self._code_marks.pop(buf.number, None)
+            return None
+        if self._marks_ns is None:
+            self._marks_ns = self.vim.api.create_namespace('leetcode_nvim')
+        with TRACER.span('rpc'):
+            self.vim.api.buf_clear_namespace(buf, self._marks_ns, 0, -1)
+            start_mark = self.vim.api.buf_set_extmark(buf, self._marks_ns, start_index, 0, {})
+            end_mark = self.vim.api.buf_set_extmark(buf, self._marks_ns, end_index, 0, {})
+        self._code_marks[buf.number] = (start_mark, end_mark)
+        return lines[start_index + 1: end_index]
+
+    def _buffer_code_lines(self, buf):
+        marks = self._code_marks.get(buf.number)
+        if marks is None:
+            return self._scan_code_marks(buf)
+        with TRACER.span('rpc'):
+            start = self.vim.api.buf_get_extmark_by_id(buf, self._marks_ns, marks[0], {})
+            end = self.vim.api.buf_get_extmark_by_id(buf, self._marks_ns, marks[1], {})
+            if not start or not end or end[0] <= start[0]:
+                return self._scan_code_marks(buf)
+            lines = self.vim.api.buf_get_lines(buf, start[0], end[0] + 1, False)
+        # the marked lines may have been edited away, fall back to a full scan then
+        if '@code-start' not in lines[0] or '@code-end' not in lines[-1]:
+            return self._scan_code_marks(buf)
+        return lines[1:-1]
+
+    def _begin_run(self, bufnr):
+        cancel = threading.Event()
+        with self._runs_lock:
+            previous = self._runs.get(bufnr)
+            if previous is not None:
+                previous.set()
+            self._runs[bufnr] = cancel
+        return cancel
+
+    def _end_run(self, bufnr, cancel):
+        with self._runs_lock:
+            if self._runs.get(bufnr) is cancel:
+                del self._runs[bufnr]
+
+    def _write_for_judge(self, buf):
+        if self._save_before_judge:
+            self._own_writes.add(buf.number)
+            self.vim.command("w")
+
+    def _on_auto_test_timer(self, bufnr):
+        self.vim.async_call(self._start_auto_test, bufnr)
+
+    def _start_auto_test(self, bufnr):
+        buf = self.vim.buffers[bufnr]
+        if not buf.valid:
+            return
+        session = self._session_for(buf.name)
+        problem_id, title, ext = LeetcodePlugin.extract_data_from_line(buf.name.split('/')[-1])
+        lang = self.find_lang_by_extension(ext) if ext else None
+        if not (problem_id and title and lang) or not session.is_logged_in() or session.is_offline():
+            return
+        code_lines = self._buffer_code_lines(buf)
+        if code_lines is None:
+            return
+        testcases = buf.vars.get('leetcode_testcases')
+        cancel = self._begin_run(bufnr)
+        self._echo('Auto testing...')
+
+        def run():
+            try:
+                result_msg, jo = session.test_code(problem_id, title, lang, code_lines, testcases, cancel)
+            except Exception as e:
+                result_msg, jo = 'Auto test failed: %s' % e, None
+            finally:
+                self._end_run(bufnr, cancel)
+            if result_msg is not None and not cancel.is_set():
+                self.vim.async_call(self._show_result, result_msg, jo)
+
+        th = threading.Thread(target=run, name='leetcode-auto-test')
+        th.daemon = True
+        th.start()
+
+    def _schedule_probe(self):
+        if self._probe_interval <= 0 or self._probe_timer is not None:
+            return
+        self._probe_timer = threading.Timer(self._probe_interval, self._on_probe_timer)
+        self._probe_timer.daemon = True
+        self._probe_timer.start()
+
+    def _on_probe_timer(self):
+        self._probe_timer = None
+        if not self.session.is_offline():
+            return
+        if not self.session.probe():
+            self._schedule_probe()
+            return
+        self._set_offline(False)
+        self.vim.async_call(self._echo, 'Connection is back, leaving offline mode!')
+        if self._outbox_size() > 0:
+            self._flush_outbox(background=True)
+
+    def _set_offline(self, offline):
+        for session in self.sessions.values():
+            session.set_offline(offline)
+
+    def _outbox_size(self):
+        return sum(session.outbox_size() for session in self.sessions.values())
+
+    def _flush_outbox(self, background=False):
+        results, remaining = [], 0
+        for namespace, session in sorted(self.sessions.items(), key=lambda kv: kv[0] or ''):
+            flushed, left = session.flush_outbox()
+            if len(self.sessions) > 1:
+                flushed = ['(%s) %s' % (namespace, result) for result in flushed]
+            results += flushed
+            remaining += left
+        if remaining:
+            self._set_offline(True)
+            self._schedule_probe()
+            results.append('%d queued request(s) left, connection lost again, back to offline mode!' % remaining)
+        elif not results:
+            results.append('Outbox is empty!')
+        message = '\n\n'.join(results)
+        if background:
+            self.vim.async_call(self._show_result, message, None)
+        else:
+            self._show_result(message, None)
+
+    def _on_prefetch_timer(self, key, lines, session):
+        lang = session.get_config('default_lang')
+        for line in lines:
+            problem_id, title, _ = LeetcodePlugin.extract_data_from_line(line)
+            if problem_id and title:
+                self._prefetch_worker.submit((session.namespace(), problem_id, lang), self._run_prefetch,
+                                             session, problem_id, title, lang)
+
+    def _run_prefetch(self, session, problem_id, title, lang):
+        with TRACER.command('prefetch'):
+            session.prefetch(problem_id, title, lang)
+
+    def _run_preview_fetch(self, session, problem_id, title):
+        error = None
+        with TRACER.command('preview'):
+            try:
+                if not session.prefetch_question(problem_id, title):
+                    error = 'Login with browser cookie first!'
+            except Exception as e:
+                error = 'Failed to load the description: %s' % e
+        if self._preview_wanted != (problem_id, title):
+            return
+        if error is None:
+            self._on_preview_timer('preview', session, problem_id, title)
+        else:
+            self.vim.async_call(self._update_preview, ('error', problem_id, title), [error])
+
+    def _preview_visible(self):
+        return self._preview_buf is not None and self._preview_buf.valid \
+            and self.vim.funcs.bufwinid(self._preview_buf.number) > 0
+
+    def _on_preview_timer(self, key, session, problem_id, title):
+        self._preview_wanted = (problem_id, title)
+        try:
+            lines = session.get_preview(problem_id, title)
+        except Exception as e:
+            lines = ['Failed to load the description: %s' % e]
+        if lines is None and session.is_offline():
+            self.vim.async_call(self._update_preview, ('offline', problem_id, title),
+                                ['Problem %s is not cached, not available offline!' % title])
+        elif lines is None:
+            self.vim.async_call(self._update_preview, ('loading', problem_id, title), ['Loading...'])
+            self._prefetch_worker.submit((session.namespace(), problem_id, 'preview'), self._run_preview_fetch,
+                                         session, problem_id, title)
+        else:
+            self.vim.async_call(self._update_preview, (problem_id, title), lines)
+
+    def _update_preview(self, key, lines):
+        if key == self._preview_key or not self._preview_visible():
+            return
+        old = self._preview_lines
+        prefix = 0
+        limit = min(len(old), len(lines))
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[len(old) - 1 - suffix] == lines[len(lines) - 1 - suffix]:
+            suffix += 1
+        with TRACER.span('rpc'):
+            buf = self._preview_buf
+            buf.options['modifiable'] = True
+            self.vim.api.buf_set_lines(buf, prefix, len(old) - suffix, False, lines[prefix: len(lines) - suffix])
+            buf.options['modifiable'] = False
+            if key[0] not in ('loading', 'offline', 'error'):
+                self.vim.api.win_set_cursor(self.vim.funcs.bufwinid(buf.number), [1, 0])
+        self._preview_key = key
+        self._preview_lines = list(lines)
+
+    def _trigger_preview(self, line, session):
+        problem_id, title, _ = LeetcodePlugin.extract_data_from_line(line)
+        if problem_id and title:
+            self._preview_debouncer.trigger('preview', session, problem_id, title)
+
+    @neovim.function('LCPreview')
+    @_traced('LCPreview')
+    def lc_preview(self, args):
+        if self._preview_visible():
+            self.vim.command('%dclose' % self.vim.funcs.bufwinnr(self._preview_buf.number))
+            return
+        line = self.vim.current.line
+        win = self.vim.current.window
+        self._preview_buf = self._open_scratch('preview', [], split='botright vsplit')
+        self.vim.command('setlocal wrap linebreak')
+        self._preview_key = None
+        self._preview_lines = ['']
+        self.vim.current.window = win
+        self._trigger_preview(line, self._session_for(self.vim.current.buffer.name))
+
+    @neovim.autocmd('CursorMoved', pattern='problems_tmp.txt',
+                    eval='[getline(line(".") - 1), getline("."), getline(line(".") + 1), expand("%:p")]')
+    def on_problems_cursor_moved(self, lines):
+        session = self._session_for(lines[3])
+        if self._preview_buf is not None:
+            self._trigger_preview(lines[1], session)
+        if not self._prefetch or session.is_offline():
+            return
+        focused = [lines[1]]
+        if self._prefetch_neighbours:
+            focused += [lines[2], lines[0]]
+        self._prefetch_debouncer.trigger('prefetch', focused, session)
+
+    @neovim.autocmd('CursorHold', pattern='problems_tmp.txt',
+                    eval='[getline(line(".") - 1), getline("."), getline(line(".") + 1), expand("%:p")]')
+    def on_problems_cursor_hold(self, lines):
+        self.on_problems_cursor_moved(lines)
+
+    @neovim.autocmd('BufWritePost', pattern='no-*', eval='expand("<abuf>")')
+    def on_buf_write_post(self, bufnr):
+        bufnr = int(bufnr)
+        if bufnr in self._own_writes:
+            self._own_writes.discard(bufnr)
+            return
+        if self._auto_test:
+            self._auto_test_debouncer.trigger(bufnr)
 
     @staticmethod
     def extract_data_from_line(line):
@@ -896,13 +2653,18 @@ class LeetcodePlugin(object):
 
     @staticmethod
     def _extract_data_from_full_line(line):
+        d = LeetcodePlugin.extract_attrs_from_line(line)
+        return d.get('question_id'), d.get('title_slug')
+
+    @staticmethod
+    def extract_attrs_from_line(line):
         p = re.compile(REGEXP_ATTRS)
         matched_attrs = p.findall(line)
         d = {}
         for attr in matched_attrs:
             splits = attr.split('=')
             d[splits[0]] = splits[1]
-        return d['question_id'], d['title_slug']
+        return d
 
     @staticmethod
     def _extract_data_from_compact_line(line):
@@ -916,9 +2678,22 @@ class LeetcodePlugin(object):
                 return k
 
     @neovim.function('LCLoginWithCookie')
+    @_traced('LCLoginWithCookie')
     def lc_login_with_cookie(self, args):
         self.session.play_ringtone('send_ringtone')
-        self.session.login(args[0], args[1], args[2])
+        account = args[3] if len(args) > 3 and args[3] else LC_DEFAULT_ACCOUNT
+        namespace = LeetcodeSession.make_namespace(args[0], account)
+        session = self.sessions.get(namespace)
+        if session is None:
+            if self.session.is_logged_in():
+                session = LeetcodeSession(self._configs, bound=False)
+            else:
+                session = self.session
+                self.sessions.pop(None, None)
+            session.set_offline(self.session.is_offline())
+        session.login(args[0], args[1], args[2], account)
+        self.sessions[session.namespace()] = session
+        self.session = session
         if self.session.is_logged_in():
             self._echo('Successfully logged in with browser cookie!')
         else:
@@ -937,7 +2712,232 @@ class LeetcodePlugin(object):
         self.vim.command('call matchadd("hlg_hard", ".*level=3.*")')
         self.vim.command('call matchadd("hlg_ac", ".*status=ac.*")')
 
+    def _setup_submissions_page(self):
+        self.vim.command('setlocal conceallevel=2')
+        self.vim.command('setlocal concealcursor=n')
+        self.vim.command('setlocal nowrap')
+        self.vim.command('syntax match hide_data "{{{.*}}}" conceal')
+        self.vim.command('highlight hlg_accepted ctermfg=green guifg=green')
+        self.vim.command('highlight hlg_rejected ctermfg=red guifg=red')
+        self.vim.command('call clearmatches()')
+        self.vim.command('call matchadd("hlg_rejected", ".*submission_id=.*")')
+        self.vim.command('call matchadd("hlg_accepted", ".*status=ac.*")')
+
+    @staticmethod
+    def _build_submission_lines(jo, page):
+        lines = []
+        for x in jo.get('submissions_dump', []):
+            when = x.get('time')
+            if x.get('timestamp'):
+                when = time.strftime('%Y-%m-%d %H:%M', time.localtime(int(x['timestamp'])))
+            text = '%-16s %-22s %-10s %-10s %s' % (when, x.get('status_display'), x.get('lang'),
+                                                   x.get('runtime'), x.get('memory'))
+            attrs = [('submission_id', x['id']), ('page', page)]
+            if x.get('status_display') == 'Accepted':
+                attrs.append(('status', 'ac'))
+            lines.append(Line(text, attrs=attrs).__str__())
+        if jo.get('has_next'):
+            lines.append(LC_MORE_LINE)
+        return lines
+
+    @neovim.function('LCSubmissions')
+    @_traced('LCSubmissions')
+    def lc_submissions(self, args):
+        session = self._session_for(self.vim.current.buffer.vars.get('leetcode_namespace') or self.vim.current.buffer.name)
+        session.play_ringtone('send_ringtone')
+        if not session.is_logged_in():
+            self._echo('Login with browser cookie first!')
+            return
+        buf = self.vim.current.buffer
+        if len(args) > 0 and args[0] == 'more':
+            problem_id = buf.vars.get('leetcode_problem_id')
+            title = buf.vars.get('leetcode_title')
+            page = buf.vars.get('leetcode_next_page')
+            if not problem_id or page is None or page < 0:
+                self._echo('Open the submission list with LCSubmissions() first!')
+                return
+            try:
+                jo = session.get_submissions_page(problem_id, title, page,
+                                                  lastkey=buf.vars.get('leetcode_next_key') or '')
+            except RuntimeError as e:
+                self._echo(str(e))
+                return
+            lines = self._build_submission_lines(jo, page)
+            self._append_scratch(buf, lines, replace_last=True)
+            buf.vars['leetcode_next_page'] = page + 1 if jo.get('has_next') else -1
+            buf.vars['leetcode_next_key'] = jo.get('last_key') or ''
+            self._echo('Page %d loaded!' % (page + 1))
+            return
+        problem_id, title, _ = self._problem_under_cursor()
+        if not (problem_id and title):
+            self._echo('No enough information provided!')
+            return
+        use_cache = not (len(args) > 0 and args[0] == 'refresh')
+        try:
+            jo = session.get_submissions_page(problem_id, title, 0, use_cache)
+        except RuntimeError as e:
+            self._echo(str(e))
+            return
+        lines = self._build_submission_lines(jo, 0)
+        if not lines:
+            self._echo('No submissions yet!')
+            return
+        buf = self._open_scratch('submissions/' + title, lines, split='botright 15split')
+        buf.vars['leetcode_problem_id'] = str(problem_id)
+        buf.vars['leetcode_title'] = title
+        buf.vars['leetcode_namespace'] = session.namespace()
+        buf.vars['leetcode_next_page'] = 1 if jo.get('has_next') else -1
+        buf.vars['leetcode_next_key'] = jo.get('last_key') or ''
+        self._setup_submissions_page()
+        self._echo('Submissions loaded, call LCSubmissionOpen() on a line to view its code!')
+
+    @neovim.function('LCSubmissionOpen')
+    @_traced('LCSubmissionOpen')
+    def lc_submission_open(self, args):
+        session = self._session_for(self.vim.current.buffer.vars.get('leetcode_namespace'))
+        buf = self.vim.current.buffer
+        attrs = LeetcodePlugin.extract_attrs_from_line(self.vim.current.line)
+        problem_id = buf.vars.get('leetcode_problem_id')
+        title = buf.vars.get('leetcode_title')
+        if 'submission_id' not in attrs or not problem_id:
+            self._echo('Move the cursor to a submission first!')
+            return
+        try:
+            f = session.get_submission_code(problem_id, title, int(attrs['page']), attrs['submission_id'])
+        except RuntimeError as e:
+            self._echo(str(e))
+            return
+        with TRACER.span('rpc'):
+            self.vim.command('vsplit ' + f)
+        self._echo('Submission %s opened!' % attrs['submission_id'])
+
+    def _start_timer(self, seconds, fn, *args):
+        timer = threading.Timer(seconds, fn, args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _start_contest(self, session, contest_slug, lang, attempt):
+        try:
+            results, jo = session.prepare_contest(contest_slug, lang)
+        except (RuntimeError, requests.RequestException) as e:
+            results, jo = None, {'error': str(e)}
+        if results is None and 'error' not in jo and attempt < LC_CONTEST_RETRIES:
+            self._contest_timers.append(self._start_timer(1, self._start_contest, session, contest_slug, lang,
+                                                          attempt + 1))
+            return
+        self.vim.async_call(self._open_contest, contest_slug, results, jo)
+
+    def _open_contest(self, contest_slug, results, jo):
+        if results is None:
+            self._echo('Failed to load %s: %s' % (contest_slug, jo.get('error') or 'no questions yet'))
+            return
+        opened = 0
+        errors = []
+        for f, msg in results:
+            if f is None:
+                errors.append(msg)
+                continue
+            with TRACER.span('rpc'):
+                self.vim.command('tabedit ' + self.vim.funcs.fnameescape(f))
+            opened += 1
+        if opened:
+            self.vim.command('tabnext %d' % (self.vim.funcs.tabpagenr() - opened + 1))
+        self._echo('\n'.join(['%d problem(s) of %s ready!' % (opened, contest_slug)] + errors))
+
+    @neovim.function('LCContest')
+    @_traced('LCContest')
+    def lc_contest(self, args):
+        session = self.session
+        session.play_ringtone('send_ringtone')
+        if not session.is_logged_in():
+            self._echo('Login with browser cookie first!')
+            return
+        if len(args) == 0:
+            self._echo('Which contest? e.g. LCContest("weekly-contest-300")')
+            return
+        contest_slug = args[0]
+        lang = args[1].lower() if len(args) > 1 else session.get_config('default_lang')
+        if lang not in EXTENSIONS:
+            self._echo('Unknown language %s, use one of: %s' % (lang, ', '.join(sorted(EXTENSIONS))))
+            return
+        for timer in self._contest_timers:
+            timer.cancel()
+        self._contest_timers = []
+        try:
+            jo = session.get_contest(contest_slug)
+        except (RuntimeError, requests.RequestException) as e:
+            self._echo('Failed to load %s: %s' % (contest_slug, e))
+            return
+        wait = ((jo.get('contest') or {}).get('start_time') or 0) - time.time()
+        if jo.get('questions') or wait <= 0:
+            self._echo('Fetching %s...' % contest_slug)
+            th = threading.Thread(target=self._start_contest, args=(session, contest_slug, lang, 0),
+                                  name='leetcode-contest')
+            th.daemon = True
+            th.start()
+            return
+        self._contest_timers = [
+            self._start_timer(max(0.0, wait - LC_CONTEST_WARMUP), session.warm_up),
+            self._start_timer(wait, self._start_contest, session, contest_slug, lang, 0)
+        ]
+        self._echo('%s starts in %dm%02ds, its problems will open in tabs when it starts!'
+                   % (contest_slug, wait // 60, wait % 60))
+
+    @neovim.function('LCDashboard')
+    @_traced('LCDashboard')
+    def lc_dashboard(self, args):
+        session = self._session_for(self.vim.current.buffer.name)
+        self._open_scratch('dashboard', session.get_dashboard())
+
+    @neovim.function('LCSwitchEndpoint')
+    @_traced('LCSwitchEndpoint')
+    def lc_switch_endpoint(self, args):
+        namespaces = sorted(ns for ns in self.sessions if ns is not None)
+        if len(args) == 0:
+            if not namespaces:
+                self._echo('Login with browser cookie first!')
+                return
+            self._echo('\n'.join(('* ' if ns == self.session.namespace() else '  ') + ns for ns in namespaces))
+            return
+        target = args[0] if '/' in args[0] else LeetcodeSession.make_namespace(args[0], args[1] if len(args) > 1 else None)
+        if target not in self.sessions:
+            candidates = [ns for ns in namespaces if ns.startswith(args[0] + '/')]
+            if len(args) > 1 or not candidates:
+                self._echo('No session for %s, login with LCLoginWithCookie first!' % target)
+                return
+            target = candidates[0]
+        self.session = self.sessions[target]
+        self.session.activate()
+        self._echo('Switched to %s!' % target)
+
+    @neovim.function('LCRefreshAll')
+    @_traced('LCRefreshAll')
+    def lc_refresh_all(self, args):
+        category = args[0] if len(args) > 0 else 'all'
+        sessions = sorted((ns, s) for ns, s in self.sessions.items() if ns is not None and s.is_logged_in())
+        if not sessions:
+            self._echo('Login with browser cookie first!')
+            return
+        self._echo('Refreshing %s...' % ', '.join(ns for ns, _ in sessions))
+        results = {}
+
+        def refresh(namespace, session):
+            try:
+                results[namespace] = session.get_problems(category, False)[1]
+            except Exception as e:
+                results[namespace] = 'Failed: %s' % e
+
+        threads = [threading.Thread(target=refresh, args=item, name='leetcode-refresh-' + item[0])
+                   for item in sessions]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self._echo('\n'.join('%s: %s' % (ns, results[ns]) for ns, _ in sessions))
+
     @neovim.function('LCListProblems')
+    @_traced('LCListProblems')
     def lc_list_problems(self, args):
         self.session.play_ringtone('send_ringtone')
         if self.session.is_logged_in():
@@ -953,7 +2953,10 @@ class LeetcodePlugin(object):
                     use_cache = False
             self._echo('Loading problems...')
             f, msg = self.session.get_problems(category, use_cache)
-            self.vim.command('e ' + f)
+            if f is None:
+                self._echo(msg)
+                return
+            self._edit(f)
             self.vim.command('setlocal nomodifiable')
             self.vim.command('setlocal nowrap')
             self._setup_problems_page()
@@ -962,9 +2965,11 @@ class LeetcodePlugin(object):
             self._echo('Login with browser cookie first!')
 
     @neovim.function('LCCoding')
+    @_traced('LCCoding')
     def lc_coding(self, args):
-        self.session.play_ringtone('send_ringtone')
-        if self.session.is_logged_in():
+        session = self._session_for(self.vim.current.buffer.name)
+        session.play_ringtone('send_ringtone')
+        if session.is_logged_in():
             self.vim.command('nohl')
             buf_name = self.vim.current.buffer.name
             buf_name = buf_name.split('/')[-1]
@@ -979,47 +2984,53 @@ class LeetcodePlugin(object):
                 if len(args) > 0:
                     lang = args[0].lower()
                 if not lang:
-                    lang = self.session.get_config('default_lang')
-                f, msg = self.session.get_problem_code(problem_id, title, lang, True)
+                    lang = session.get_config('default_lang')
+                f, msg = session.get_problem_code(problem_id, title, lang, True)
                 if f:
-                    self.vim.command('e ' + f)
+                    self._edit(f)
                     self._echo(msg)
                 else:
-                    self._echo('No code snippet for ' + lang + ' found!')
+                    self._echo(msg or 'No code snippet for ' + lang + ' found!')
             else:
                 self._echo('No enough information provided!')
         else:
             self._echo('Login with browser cookie first!')
 
     @neovim.function('LCCodingReset')
+    @_traced('LCCodingReset')
     def lc_coding_reset(self, args):
-        self.session.play_ringtone('send_ringtone')
-        if self.session.is_logged_in():
+        session = self._session_for(self.vim.current.buffer.name)
+        session.play_ringtone('send_ringtone')
+        if session.is_logged_in():
             self.vim.command('nohl')
             buf_name = self.vim.current.buffer.name
             buf_name = buf_name.split('/')[-1]
             problem_id, title, ext = LeetcodePlugin.extract_data_from_line(buf_name)
             lang = self.find_lang_by_extension(ext)
             if problem_id and title and lang:
-                f, msg = self.session.get_problem_code(problem_id, title, lang, False)
+                f, msg = session.get_problem_code(problem_id, title, lang, False)
                 if f:
-                    self.vim.command('e ' + f)
-                    self._echo(msg)
+                    self._edit(f)
+                self._echo(msg)
             else:
                 self._echo('Only the opened solution file can be reset!')
 
     @neovim.function('LCTest')
+    @_traced('LCTest')
     def lc_run(self, args):
-        self.session.play_ringtone('send_ringtone')
-        if self.session.is_logged_in():
-            self.vim.command("w")
+        session = self._session_for(self.vim.current.buffer.name)
+        session.play_ringtone('send_ringtone')
+        if session.is_logged_in():
+            buf = self.vim.current.buffer
+            self._write_for_judge(buf)
             self._echo("Testing...")
-            buf_name = self.vim.current.buffer.name
+            buf_name = buf.name
             buf_name = buf_name.split('/')[-1]
             if len(args) > 0:
                 testcases = args[0]
                 if '//n//' in testcases:
                     testcases = testcases.replace('//n//', '\n')
+                buf.vars['leetcode_testcases'] = testcases
             else:
                 testcases = None
             lang = None
@@ -1027,37 +3038,56 @@ class LeetcodePlugin(object):
             if ext:
                 lang = self.find_lang_by_extension(ext)
             if problem_id and title and lang:
-                result_msg = self.session.test(problem_id, title, lang, testcases)
-                self._echo(result_msg)
+                code_lines = self._buffer_code_lines(buf)
+                if code_lines is None:
+                    self._echo('No @code-start/@code-end found!')
+                    return
+                self._auto_test_debouncer.cancel(buf.number)
+                cancel = self._begin_run(buf.number)
+                try:
+                    result_msg, jo = session.test_code(problem_id, title, lang, code_lines, testcases, cancel)
+                finally:
+                    self._end_run(buf.number, cancel)
+                if result_msg is not None:
+                    self._show_result(result_msg, jo)
             else:
                 self._echo('Not a valid solution file!')
         else:
             self._echo('Login with browser cookie first!')
 
     @neovim.function('LCSubmit')
+    @_traced('LCSubmit')
     def lc_submit(self, args):
-        self.session.play_ringtone('send_ringtone')
-        if self.session.is_logged_in():
-            self.vim.command("w")
+        session = self._session_for(self.vim.current.buffer.name)
+        session.play_ringtone('send_ringtone')
+        if session.is_logged_in():
+            buf = self.vim.current.buffer
+            self._write_for_judge(buf)
             self._echo("Submiting...")
-            buf_name = self.vim.current.buffer.name.strip()
+            buf_name = buf.name.strip()
             buf_name = buf_name.split('/')[-1]
             lang = None
             problem_id, title, ext = LeetcodePlugin.extract_data_from_line(buf_name)
             if ext:
                 lang = self.find_lang_by_extension(ext)
             if problem_id and title and lang:
-                result_msg = self.session.submit(problem_id, title, lang)
-                self._echo(result_msg)
+                code_lines = self._buffer_code_lines(buf)
+                if code_lines is None:
+                    self._echo('No @code-start/@code-end found!')
+                    return
+                result_msg, jo = session.submit_code(problem_id, title, lang, code_lines)
+                self._show_result(result_msg, jo)
             else:
                 self._echo('Not a valid solution file!')
         else:
             self._echo('Login with browser cookie first!')
 
     @neovim.function("LCGetLatestSubmission")
+    @_traced("LCGetLatestSubmission")
     def lc_get_latest_submission(self, args):
-        self.session.play_ringtone('send_ringtone')
-        if self.session.is_logged_in():
+        session = self._session_for(self.vim.current.buffer.name)
+        session.play_ringtone('send_ringtone')
+        if session.is_logged_in():
             buf_name = self.vim.current.buffer.name
             buf_name = buf_name.split('/')[-1]
             current_line = self.vim.current.line
@@ -1071,24 +3101,184 @@ class LeetcodePlugin(object):
                 if len(args) > 0:
                     lang = args[0].lower()
                 if not lang:
-                    lang = self.session.get_config('default_lang')
-                f, msg = self.session.get_last_submission(problem_id, title, lang)
+                    lang = session.get_config('default_lang')
+                f, msg = session.get_last_submission(problem_id, title, lang)
                 if f:
-                    self.vim.command('e ' + f)
+                    self._edit(f)
                     self._echo(msg)
         else:
             self._echo('Login with browser cookie first!')
 
     @neovim.function("LCGetCards")
+    @_traced("LCGetCards")
     def lc_get_cards(self, args):
         self.session.play_ringtone('send_ringtone')
         if self.session.is_logged_in():
             self._echo('Loading problems...')
             f, msg = self.session.get_cards('learn')
-            self.vim.command('e ' + f)
-            self.vim.command('set nomodifiable')
+            if f:
+                self._edit(f)
+                self.vim.command('set nomodifiable')
             self._echo(msg)
 
+    @staticmethod
+    def _build_explore_line(depth, title, attrs, leaf=False):
+        prefix = '  ' if leaf else '+ '
+        return Line(LC_EXPLORE_INDENT * depth + prefix + title, attrs=attrs).__str__()
+
+    def _setup_explore_page(self):
+        self.vim.command('setlocal conceallevel=2')
+        self.vim.command('setlocal concealcursor=n')
+        self.vim.command('setlocal nowrap')
+        self.vim.command('setlocal shiftwidth=%d' % len(LC_EXPLORE_INDENT))
+        self.vim.command('setlocal foldmethod=indent foldlevel=99')
+        self.vim.command('syntax match hide_data "{{{.*}}}" conceal')
+        self.vim.command('highlight hlg_paid ctermfg=240 guifg=240')
+        self.vim.command('call clearmatches()')
+        self.vim.command('call matchadd("hlg_paid", ".*paid=1.*")')
+        self.vim.command('nnoremap <buffer> <silent> <CR> :call LCExploreToggle()<CR>')
+
+    @neovim.function('LCExplore')
+    @_traced('LCExplore')
+    def lc_explore(self, args):
+        self.session.play_ringtone('send_ringtone')
+        if not self.session.is_logged_in():
+            self._echo('Login with browser cookie first!')
+            return
+        use_cache = not (len(args) > 0 and args[0] == 'refresh')
+        try:
+            categories = self.session.get_explore_categories(use_cache)
+        except RuntimeError as e:
+            self._echo(str(e))
+            return
+        lines = list(map(lambda x: self._build_explore_line(0, x['title'], [
+            ('node', 'category'), ('category', x['slug'])]), categories))
+        self._open_scratch('explore', lines)
+        self._setup_explore_page()
+        self._echo('Press <Enter> to expand a node or to open a question!')
+
+    def _explore_children(self, attrs, depth):
+        node = attrs.get('node')
+        if node == 'category':
+            categories = self.session.get_explore_categories()
+            cards = list(filter(lambda x: x['slug'] == attrs['category'], categories))[0]['cards']
+            return list(map(lambda x: self._build_explore_line(depth, x['title'], [
+                ('node', 'card'), ('category', attrs['category']), ('card_slug', x['slug']),
+                ('paid', int(bool(x.get('paidOnly'))))]), cards))
+        elif node == 'card':
+            chapters = self.session.get_explore_chapters(attrs['category'], attrs['card_slug'])
+            return list(map(lambda x: self._build_explore_line(depth, x['title'], [
+                ('node', 'chapter'), ('category', attrs['category']), ('card_slug', attrs['card_slug']),
+                ('chapter_id', x['id'])]), chapters))
+        elif node == 'chapter':
+            items = self.session.get_explore_chapter(attrs['category'], attrs['card_slug'], attrs['chapter_id'])
+            return list(map(lambda x: self._build_explore_line(depth, x['title'], [
+                ('node', 'item'), ('item_id', x['id']), ('paid', int(bool(x.get('paidOnly'))))], leaf=True), items))
+        return []
+
+    @neovim.function('LCExploreToggle')
+    @_traced('LCExploreToggle')
+    def lc_explore_toggle(self, args):
+        buf = self.vim.current.buffer
+        line = self.vim.current.line
+        attrs = LeetcodePlugin.extract_attrs_from_line(line)
+        if 'node' not in attrs:
+            self._echo('Not an explore node!')
+            return
+        if attrs['node'] == 'item':
+            lang = args[0].lower() if len(args) > 0 else self.session.get_config('default_lang')
+            try:
+                f, msg = self.session.get_explore_item_code(attrs['item_id'], lang)
+            except RuntimeError as e:
+                self._echo(str(e))
+                return
+            if f:
+                self._edit(f)
+            self._echo(msg)
+            return
+        row = self.vim.current.window.cursor[0] - 1
+        depth = (len(line) - len(line.lstrip(' '))) // len(LC_EXPLORE_INDENT)
+        next_lines = self.vim.api.buf_get_lines(buf, row + 1, row + 2, False)
+        if next_lines and len(next_lines[0]) - len(next_lines[0].lstrip(' ')) > depth * len(LC_EXPLORE_INDENT):
+            self.vim.command('normal! za')
+            return
+        try:
+            children = self._explore_children(attrs, depth + 1)
+        except RuntimeError as e:
+            self._echo(str(e))
+            return
+        if not children:
+            self._echo('Nothing inside!')
+            return
+        indent = LC_EXPLORE_INDENT * depth
+        with TRACER.span('rpc'):
+            buf.options['modifiable'] = True
+            self.vim.api.buf_set_lines(buf, row, row + 1, False, [indent + '- ' + line[len(indent) + 2:]])
+            self.vim.api.buf_set_lines(buf, row + 1, row + 1, False, children)
+            buf.options['modifiable'] = False
+
+    @neovim.function('LCTrace')
+    def lc_trace(self, args):
+        action = args[0].lower() if len(args) > 0 else 'show'
+        if action == 'on':
+            trace_file = None
+            if len(args) > 1 and args[1]:
+                trace_file = args[1]
+            TRACER.configure(True, trace_file)
+            self._echo('Tracing enabled!')
+        elif action == 'off':
+            TRACER.configure(False)
+            self._echo('Tracing disabled!')
+        elif action == 'clear':
+            TRACER.clear()
+            self._echo('Trace samples cleared!')
+        else:
+            self._echo(TRACER.report())
+
+    @neovim.function('LCProfile')
+    def lc_profile(self, args):
+        action = args[0].lower() if len(args) > 0 else 'status'
+        if action == 'start':
+            frames = int(args[1]) if len(args) > 1 and args[1] else LC_PROFILE_FRAMES
+            if PROFILER.start(frames):
+                self._echo('Profiling started!')
+            else:
+                self._echo('Profiler is already running!')
+        elif action == 'stop':
+            report = PROFILER.stop(self.session._get_path(LC_PROFILES_HOME))
+            if report is None:
+                self._echo('Profiler is not running!')
+            else:
+                self._echo('Profile saved to %s' % report)
+        else:
+            self._echo(PROFILER.status())
+
+    @neovim.function('LCOffline')
+    @_traced('LCOffline')
+    def lc_offline(self, args):
+        action = args[0].lower() if len(args) > 0 else 'status'
+        if action == 'on':
+            self._set_offline(True)
+            self._echo('Offline mode on, tests and submits will be queued!')
+            self._schedule_probe()
+        elif action == 'off':
+            self._set_offline(False)
+            self._echo('Offline mode off, flushing queued requests...')
+            self._flush_outbox()
+        elif action == 'flush':
+            if self.session.is_offline():
+                self._echo('Leave offline mode first!')
+            else:
+                self._flush_outbox()
+        else:
+            self._echo('Offline mode: %s, queued requests: %d'
+                       % ('on' if self.session.is_offline() else 'off', self._outbox_size()))
+
+    @neovim.function('LCNetStats')
+    def lc_net_stats(self, args):
+        workers = [self._prefetch_worker.report(), AUDIO.worker_report()]
+        self._echo('%s\n%s' % (RATE_LIMITER.report(), '\n'.join(workers)))
+
 # s = LeetcodeSession({})
 # f, msg = s.get_cards('learn')
 # txt = s.get_api().graphql_get_categories()
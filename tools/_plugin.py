@@ -0,0 +1,16 @@
+import importlib.util
+import os
+import sys
+
+PLUGIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           os.pardir, 'rplugin', 'python3', 'leetcode-nvim.py')
+
+
+def load_plugin():
+    module = sys.modules.get('leetcode_nvim')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('leetcode_nvim', PLUGIN_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['leetcode_nvim'] = module
+        spec.loader.exec_module(module)
+    return module
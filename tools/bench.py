@@ -0,0 +1,275 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from _plugin import load_plugin
+
+SIZES = (1000, 5000, 20000)
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+WORDS = ['array', 'string', 'tree', 'graph', 'sum', 'path', 'window', 'maximum', 'minimum',
+         'subarray', 'sequence', 'matrix', 'palindrome', 'interval', 'cache', 'median']
+
+
+def _title(rnd):
+    return ' '.join(rnd.choice(WORDS).capitalize() for _ in range(rnd.randint(2, 6)))
+
+
+def make_problems(n, seed=0):
+    rnd = random.Random(seed)
+    pairs = []
+    for qid in range(1, n + 1):
+        title = _title(rnd)
+        pairs.append({
+            'stat': {
+                'question_id': qid,
+                'question__title': title,
+                'question__title_slug': title.lower().replace(' ', '-') + '-%d' % qid,
+                'question__hide': False,
+                'total_acs': rnd.randint(0, 10 ** 6),
+                'total_submitted': rnd.randint(0, 10 ** 6),
+                'frontend_question_id': qid,
+                'is_new_question': False
+            },
+            'status': rnd.choice([None, None, 'ac', 'notac']),
+            'difficulty': {'level': rnd.randint(1, 3)},
+            'paid_only': rnd.random() < 0.1,
+            'is_favor': False,
+            'frequency': 0,
+            'progress': 0
+        })
+    rnd.shuffle(pairs)
+    return {
+        'user_name': 'bench',
+        'num_solved': 0,
+        'num_total': n,
+        'category_slug': 'all',
+        'stat_status_pairs': pairs
+    }
+
+
+def make_question(paragraphs, seed=0):
+    rnd = random.Random(seed)
+    content = []
+    for i in range(paragraphs):
+        words = ' '.join(rnd.choice(WORDS) for _ in range(40))
+        content.append('<p>%s <code>nums[%d]</code> <strong>%s</strong></p>' % (words, i, rnd.choice(WORDS)))
+        if i % 5 == 0:
+            content.append('<pre><strong>Input:</strong> nums = [%s]\n<strong>Output:</strong> %d</pre>'
+                           % (','.join(str(rnd.randint(-99, 99)) for _ in range(20)), i))
+            content.append('<ul>%s</ul>' % ''.join('<li><code>%d &lt;= n</code></li>' % j for j in range(4)))
+    snippets = [{'lang': lang, 'langSlug': lang,
+                 'code': 'class Solution {\n    public int solve(int[] nums) {\n        \n    }\n}'}
+                for lang in ('java', 'cpp', 'python3', 'c', 'golang')]
+    return {'data': {'question': {
+        'title': 'Bench Question',
+        'titleSlug': 'bench-question',
+        'content': ''.join(content),
+        'isPaidOnly': False,
+        'difficulty': 'Medium',
+        'isLiked': None,
+        'codeSnippets': snippets,
+        'hints': [],
+        'status': None,
+        'sampleTestCase': '[1,2,3]'
+    }}}
+
+
+class Fixture(object):
+
+    def __init__(self, lc, size):
+        self.lc = lc
+        self.size = size
+        self.session = lc.LeetcodeSession({})
+        self.session.login('us', 'csrftoken', 'leetcode_session')
+        rnd = random.Random(size)
+        problems = make_problems(size, seed=size)
+        with open(self.session._get_path(lc.LC_PROBLEMS), 'w') as outf:
+            json.dump(problems, outf)
+        with open(self.session._get_path(lc.LC_ACLIST), 'w') as outf:
+            outf.write('\n'.join(str(i) for i in rnd.sample(range(1, size + 1), size // 4)))
+        self.lines = [str(lc.Line(lc.LeetcodeSession._problem_repr_full(i, 'Bench Question', 1 + i % 3),
+                                  [('question_id', i), ('title_slug', 'bench-question-%d' % i), ('level', 1 + i % 3)]))
+                      for i in range(1, size + 1)]
+        self.compact_names = ['no-%04d-bench-question-%d.java' % (i, i) for i in range(1, size + 1)]
+        self.question = make_question(max(1, size // 100), seed=size)
+        self.question_html = self.question['data']['question']['content']
+        with open(self.session._get_path(lc.LC_PROBLEMS_HOME)
+                  + lc.LeetcodeSession._problem_repr_compact(1, 'bench-question') + '.json', 'w') as outf:
+            json.dump(self.question, outf)
+        self.code_lines = (['// description line %d' % i for i in range(size)]
+                           + ['// @code-start']
+                           + ['    int x%d = %d;' % (i, i) for i in range(size)]
+                           + ['// @code-end'])
+
+    def get_problems(self):
+        self.session._catalogue = None
+        self.session.get_problems('all', True)
+
+    def parse_problems(self):
+        self.session._catalogue = None
+        self.session._load_problem_records(self.session._get_path(self.lc.LC_PROBLEMS))
+
+    def line_build(self):
+        lc = self.lc
+        for i in range(1, self.size + 1):
+            lc.Line('No. %04d <E> Bench Question' % i,
+                    [('question_id', i), ('title_slug', 'bench-question'), ('level', 1)])._build()
+
+    def extract_data_from_line(self):
+        extract = self.lc.LeetcodePlugin.extract_data_from_line
+        for line in self.lines:
+            extract(line)
+        for name in self.compact_names:
+            extract(name)
+
+    def html2text(self):
+        self.lc.LeetcodeSession._html2text(self.question_html)
+
+    def get_problem_code(self):
+        self.session._rendered.clear()
+        preview = self.session._get_path(self.lc.LC_PREVIEW_HOME)
+        for name in os.listdir(preview) if os.path.isdir(preview) else ():
+            os.remove(os.path.join(preview, name))
+        self.session.get_problem_code(1, 'bench-question', 'java', use_cache=False)
+
+    def cut_codes(self):
+        self.lc.LeetcodeSession._cut_codes(self.code_lines)
+
+    def update_ac_list(self):
+        for i in range(50):
+            self.session._update_ac_list(self.size + 1 + i)
+
+
+CASES = ('get_problems', 'parse_problems', 'line_build', 'extract_data_from_line', 'html2text',
+         'get_problem_code', 'cut_codes', 'update_ac_list')
+
+
+def _reset_ac_list(fixture, snapshot):
+    with open(fixture.session._get_path(fixture.lc.LC_ACLIST), 'w') as outf:
+        outf.write(snapshot)
+
+
+def measure(fixture, case, repeat):
+    fn = getattr(fixture, case)
+    with open(fixture.session._get_path(fixture.lc.LC_ACLIST), 'r') as inf:
+        ac_snapshot = inf.read()
+    timings = []
+    for _ in range(repeat):
+        _reset_ac_list(fixture, ac_snapshot)
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    _reset_ac_list(fixture, ac_snapshot)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _reset_ac_list(fixture, ac_snapshot)
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def run(sizes, cases, repeat):
+    lc = load_plugin()
+    results = {}
+    old_home = os.environ.get('HOME')
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = home
+        try:
+            for size in sizes:
+                fixture = Fixture(lc, size)
+                for case in cases:
+                    results['%s/%d' % (case, size)] = measure(fixture, case, repeat)
+        finally:
+            if old_home is not None:
+                os.environ['HOME'] = old_home
+    return results
+
+
+def _sort_key(item):
+    case, size = item[0].rsplit('/', 1)
+    return case, int(size)
+
+
+def compare(results, baseline, threshold, min_delta):
+    regressions = []
+    for key, result in sorted(results.items(), key=_sort_key):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if result[metric] - base[metric] < min_delta[metric]:
+                continue
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                regressions.append('%s %s: %.6g -> %.6g (+%.0f%%)'
+                                   % (key, metric, base[metric], result[metric],
+                                      (result[metric] / base[metric] - 1) * 100))
+    return regressions
+
+
+def report(results, baseline):
+    print('%-32s %12s %12s %14s %12s' % ('case', 'time(ms)', 'base(ms)', 'peak(KiB)', 'base(KiB)'))
+    for key, result in sorted(results.items(), key=_sort_key):
+        base = baseline.get(key, {})
+        print('%-32s %12.3f %12s %14.1f %12s' % (
+            key, result['seconds'] * 1000,
+            '%.3f' % (base['seconds'] * 1000) if base else '-',
+            result['peak_bytes'] / 1024,
+            '%.1f' % (base['peak_bytes'] / 1024) if base else '-'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the leetcode-nvim hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=CASES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative regression before failing, 0.25 means 25%%')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='ignore time regressions smaller than this, they are timer noise')
+    parser.add_argument('--min-delta-kib', type=float, default=16.0,
+                        help='ignore memory regressions smaller than this')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.cases, args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as inf:
+            baseline = json.load(inf)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.baseline, 'w') as outf:
+            json.dump({**baseline, **results}, outf, indent=2, sort_keys=True)
+        print('Baseline saved to %s' % args.baseline)
+        return 0
+
+    missing = [key for key, _ in sorted(results.items(), key=_sort_key) if key not in baseline]
+    if missing:
+        print('No baseline for %s in %s, run with --save first!' % (', '.join(missing), args.baseline))
+        return 1
+
+    regressions = compare(results, baseline, args.threshold, {
+        'seconds': args.min_delta_ms / 1000,
+        'peak_bytes': args.min_delta_kib * 1024
+    })
+    if regressions:
+        print('Regressions over %.0f%%:' % (args.threshold * 100))
+        for regression in regressions:
+            print('  ' + regression)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+import argparse
+import collections
+import glob
+import itertools
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bench import make_problems, make_question
+
+ERROR_STATUS = (429, 500, 502, 503)
+SLOW_CHUNK = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.fake.track(self.connection, True)
+
+    def finish(self):
+        self.server.fake.track(self.connection, False)
+        super().finish()
+
+    def _send_json(self, jo, status=200, headers=None):
+        fake = self.server.fake
+        body = json.dumps(jo).encode('utf-8')
+        fake.delay()
+        fake.count(status)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if not fake.slow_body:
+            self.wfile.write(body)
+            return
+        for i in range(0, len(body), SLOW_CHUNK):
+            self.wfile.write(body[i:i + SLOW_CHUNK])
+            self.wfile.flush()
+            time.sleep(SLOW_CHUNK / fake.slow_body)
+
+    def _send_fault(self):
+        fake = self.server.fake
+        status = fake.fault()
+        if status is None:
+            return False
+        headers = {}
+        if status == 429 and fake.retry_after is not None:
+            headers['Retry-After'] = str(fake.retry_after)
+        self._send_json({'error': 'injected failure'}, status=status, headers=headers)
+        return True
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length == 0:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        fake = self.server.fake
+        path = self.path.split('?', 1)[0]
+        fake.log('GET', path)
+        if self._send_fault():
+            return
+        if path == '/' or path == '':
+            return self._send_json({'ok': True})
+        m = re.match(r'^/api/problems/([a-z]+)/?$', path)
+        if m:
+            return self._send_json(fake.problems)
+        m = re.match(r'^/submissions/detail/([^/]+)/check/$', path)
+        if m:
+            return self._send_json(fake.check(m.group(1)))
+        m = re.match(r'^/api/submissions/([^/]+)/$', path)
+        if m:
+            return self._send_json(fake.submissions(m.group(1), self.path))
+        m = re.match(r'^/contest/api/info/([^/]+)/$', path)
+        if m:
+            return self._send_json(fake.contest(m.group(1)))
+        if path == '/submissions/latest/':
+            return self._send_json({'code': 'class Solution {\n    // latest\n}'})
+        self._send_json({'error': 'not found'}, status=404)
+
+    def do_HEAD(self):
+        fake = self.server.fake
+        fake.log('HEAD', self.path)
+        fake.count(200)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        fake = self.server.fake
+        path = self.path.split('?', 1)[0]
+        jo = self._read_json()
+        fake.log('POST', path, jo)
+        if self._send_fault():
+            return
+        if path == '/graphql':
+            if jo.get('operationName') == 'questionData':
+                return self._send_json(fake.question(jo['variables']['titleSlug']))
+            return self._send_json(fake.explore(jo.get('operationName'), jo.get('variables') or {}))
+        m = re.match(r'^/problems/([^/]+)/interpret_solution/$', path)
+        if m:
+            return self._send_json({'interpret_id': fake.start_run('test', jo)})
+        m = re.match(r'^/problems/([^/]+)/submit/$', path)
+        if m:
+            return self._send_json({'submission_id': fake.start_run('submit', jo)})
+        self._send_json({'error': 'not found'}, status=404)
+
+
+class _Server(ThreadingHTTPServer):
+    allow_reuse_address = True
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeLeetcode(object):
+
+    def __init__(self, host='127.0.0.1', port=0, problems=50, payloads=None, latency=0.0, jitter=0.0,
+                 judge_rounds=0, error_rate=0.0, burst=1, retry_after=None, slow_body=0, seed=0,
+                 contest_start=None):
+        self.host = host
+        self.port = port
+        self.problems = make_problems(problems)
+        self.latency = latency
+        self.jitter = jitter
+        self.judge_rounds = judge_rounds
+        self.error_rate = error_rate
+        self.burst = burst
+        self.retry_after = retry_after
+        self.slow_body = slow_body
+        self.contest_start = contest_start if contest_start is not None else time.time() - 60
+        self.requests = []
+        self.responses = collections.Counter()
+        self._questions = {}
+        self._runs = {}
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._burst_left = 0
+        self._burst_status = None
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._server = None
+        self._thread = None
+        if payloads:
+            self.load_payloads(payloads)
+
+    def load_payloads(self, directory):
+        f = os.path.join(directory, 'problems.json')
+        if os.path.exists(f):
+            with open(f, 'r') as inf:
+                self.problems = json.load(inf)
+        for f in glob.glob(os.path.join(directory, 'problems', '*.json')):
+            with open(f, 'r') as inf:
+                jo = json.load(inf)
+            question = (jo.get('data') or {}).get('question')
+            if question and question.get('titleSlug'):
+                self._questions[question['titleSlug']] = jo
+
+    @property
+    def base_url(self):
+        return 'http://%s:%d' % (self.host, self.port)
+
+    @property
+    def online(self):
+        return self._server is not None
+
+    def start(self):
+        if self._server is not None:
+            return self
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-leetcode')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def set_online(self, online):
+        if online:
+            self.start()
+        else:
+            self.stop()
+
+    def track(self, connection, opened):
+        with self._lock:
+            if opened:
+                self._connections.add(connection)
+            else:
+                self._connections.discard(connection)
+
+    def log(self, method, path, body=None):
+        with self._lock:
+            self.requests.append((method, path, body))
+
+    def count(self, status):
+        with self._lock:
+            self.responses[status] += 1
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                seconds = self.latency + self._random.uniform(0, self.jitter)
+            time.sleep(seconds)
+
+    def fault(self):
+        with self._lock:
+            if self._burst_left > 0:
+                self._burst_left -= 1
+                return self._burst_status
+            if self.error_rate and self._random.random() < self.error_rate:
+                self._burst_left = self.burst - 1
+                self._burst_status = self._random.choice(ERROR_STATUS)
+                return self._burst_status
+            return None
+
+    def question(self, title_slug):
+        with self._lock:
+            jo = self._questions.get(title_slug)
+            if jo is None:
+                jo = make_question(5, seed=len(self._questions))
+                jo['data']['question']['titleSlug'] = title_slug
+                self._questions[title_slug] = jo
+            return jo
+
+    def explore(self, operation, variables):
+        pairs = self.problems['stat_status_pairs']
+        if operation == 'GetCategories':
+            cards = [{'id': str(i), 'title': 'Card %d' % i, 'slug': 'card-%d' % i, 'categorySlug': 'learn',
+                      'paidOnly': False} for i in range(2)]
+            return {'data': {'categories': [{'id': '1', 'title': 'Learn', 'slug': 'learn', 'cards': cards}]}}
+        if operation == 'GetChapters':
+            card_slug = variables['cardSlug']
+            return {'data': {'chapters': [{'id': '%s-%d' % (card_slug, i), 'title': 'Chapter %d' % i,
+                                           'slug': 'chapter-%d' % i, 'descriptionText': ''} for i in range(3)]}}
+        if operation == 'GetChapter':
+            chapter_id = variables['chapterId']
+            return {'data': {'chapter': {'id': chapter_id, 'title': chapter_id, 'items': [
+                {'id': '%s.%d' % (chapter_id, i), 'title': pairs[i]['stat']['question__title'], 'type': 1,
+                 'paidOnly': False} for i in range(4)]}}}
+        if operation == 'GetItem':
+            index = int(variables['itemId'].rsplit('.', 1)[1])
+            stat = pairs[index]['stat']
+            return {'data': {'item': {'id': variables['itemId'], 'title': stat['question__title'], 'question': {
+                'questionId': str(stat['question_id']), 'title': stat['question__title'],
+                'titleSlug': stat['question__title_slug']}}}}
+        return {'data': {}}
+
+    def contest(self, contest_slug, size=4):
+        started = time.time() >= self.contest_start
+        questions = []
+        if started:
+            for i, pair in enumerate(self.problems['stat_status_pairs'][:size]):
+                stat = pair['stat']
+                questions.append({'question_id': stat['question_id'], 'title': stat['question__title'],
+                                  'title_slug': stat['question__title_slug'], 'credit': 3 + i})
+        return {'contest': {'title': contest_slug, 'title_slug': contest_slug, 'start_time': int(self.contest_start),
+                            'duration': 5400},
+                'questions': questions, 'registered': True}
+
+    def submissions(self, title_slug, path, total=45):
+        params = parse_qs(urlparse(path).query)
+        offset = int(params.get('offset', ['0'])[0])
+        limit = int(params.get('limit', ['20'])[0])
+        dump = []
+        for i in range(offset, min(total, offset + limit)):
+            accepted = i % 3 == 0
+            dump.append({
+                'id': 1000 + i,
+                'lang': 'java',
+                'time': '%d days ago' % i,
+                'timestamp': int(time.time()) - i * 86400,
+                'status_display': 'Accepted' if accepted else 'Wrong Answer',
+                'runtime': '%d ms' % (i + 1) if accepted else 'N/A',
+                'memory': '%.1f MB' % (40 + i / 10.0) if accepted else 'N/A',
+                'title': title_slug,
+                'code': 'class Solution {\n    // attempt %d\n}' % i
+            })
+        return {'submissions_dump': dump, 'has_next': offset + limit < total,
+                'last_key': 'key-%d' % (offset + limit)}
+
+    def start_run(self, kind, form_data):
+        with self._lock:
+            run_id = str(next(self._ids))
+            self._runs[run_id] = [kind, form_data, 0]
+            return run_id
+
+    def check(self, run_id):
+        with self._lock:
+            run = self._runs.setdefault(run_id, ['submit', {}, 0])
+            kind, form_data, polls = run
+            run[2] += 1
+        if polls < self.judge_rounds:
+            return {'state': 'PENDING' if polls < self.judge_rounds // 2 else 'STARTED'}
+        wrong = 'WRONG' in form_data.get('typed_code', '')
+        if kind == 'test':
+            return {
+                'state': 'SUCCESS',
+                'run_success': True,
+                'correct_answer': not wrong,
+                'code_answer': ['0'] if wrong else ['6'],
+                'expected_code_answer': ['6'],
+                'status_msg': 'Accepted'
+            }
+        return {
+            'state': 'SUCCESS',
+            'run_success': True,
+            'total_correct': 9 if wrong else 10,
+            'total_testcases': 10,
+            'runtime_percentile': 91.5,
+            'memory_percentile': 42.0,
+            'input_formatted': '[1,2,3]',
+            'expected_output': '6',
+            'code_output': '0' if wrong else '6',
+            'status_msg': 'Wrong Answer' if wrong else 'Accepted'
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the leetcode API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--problems', type=int, default=50)
+    parser.add_argument('--payloads', help='replay problems.json and problems/*.json recorded in this directory, '
+                                           'for example ~/.leetcode-nvim/us/default')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds added to every response')
+    parser.add_argument('--judge-rounds', type=int, default=0,
+                        help='polls answered with PENDING/STARTED before the judge succeeds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='chance that a request starts a burst of 429/5xx responses')
+    parser.add_argument('--burst', type=int, default=1, help='length of each failure burst')
+    parser.add_argument('--retry-after', type=int, help='Retry-After seconds sent with injected 429s')
+    parser.add_argument('--slow-body', type=int, default=0, help='stream response bodies at this many bytes/s')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--contest-in', type=float, default=-60,
+                        help='seconds until every contest starts, its questions are hidden until then')
+    args = parser.parse_args(argv)
+    fake = FakeLeetcode(args.host, args.port, args.problems, args.payloads, args.latency, args.jitter,
+                        args.judge_rounds, args.error_rate, args.burst, args.retry_after, args.slow_body,
+                        args.seed, time.time() + args.contest_in).start()
+    print('Serving on %s, set g:leetcode_base_url to it. Ctrl-C to stop.' % fake.base_url)
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
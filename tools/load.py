@@ -0,0 +1,136 @@
+import argparse
+import collections
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _plugin import load_plugin
+from fake_leetcode import FakeLeetcode
+
+
+class LoadDriver(object):
+
+    def __init__(self, lc, session, problems, args):
+        self.lc = lc
+        self.session = session
+        self.problems = problems
+        self.args = args
+        self.latencies = []
+        self.outcomes = collections.Counter()
+        self._lock = threading.Lock()
+
+    def _classify(self, msg, jo):
+        if jo is None:
+            return 'judge timeout' if msg and 'timed out' in msg else 'no result'
+        return jo.get('status_msg') or 'unknown'
+
+    def flow(self, index):
+        rnd = random.Random(self.args.seed + index)
+        problem_id, title, code_lines = rnd.choice(self.problems)
+        if rnd.random() < self.args.wrong_ratio:
+            code_lines = ['// WRONG'] + code_lines
+        submit = rnd.random() < self.args.submit_ratio
+        kind = 'submit' if submit else 'test'
+        start = time.perf_counter()
+        try:
+            if submit:
+                msg, jo = self.session.submit_code(problem_id, title, 'java', code_lines)
+            else:
+                msg, jo = self.session.test_code(problem_id, title, 'java', code_lines, None)
+            outcome = self._classify(msg, jo)
+        except self.lc.LeetcodeHttpError as e:
+            outcome = 'http %s' % e.status_code
+        except Exception as e:
+            outcome = 'unhandled %s' % type(e).__name__
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(seconds)
+            self.outcomes['%s: %s' % (kind, outcome)] += 1
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.args.concurrency) as executor:
+            list(executor.map(self.flow, range(self.args.flows)))
+        return time.perf_counter() - start
+
+
+def setup(lc, fake, args):
+    session = lc.LeetcodeSession({'base_url': fake.base_url, 'default_lang': 'java',
+                                  'poll_interval': args.poll_interval, 'poll_timeout': args.poll_timeout})
+    session.login('us', 'csrftoken', 'leetcode_session')
+    session.get_problems('all', False)
+    problems = []
+    for pair in fake.problems['stat_status_pairs'][:args.problems]:
+        problem_id, title = pair['stat']['question_id'], pair['stat']['question__title_slug']
+        f, _ = session.get_problem_code(problem_id, title, 'java', True)
+        with open(f, 'r') as inf:
+            code_lines = lc.LeetcodeSession._cut_codes([line.rstrip() for line in inf])
+        problems.append((problem_id, title, code_lines))
+    return session, problems
+
+
+def report(driver, fake, wall, lc):
+    latencies = sorted(driver.latencies)
+    print('flows: %d, concurrency: %d, wall: %.2fs, throughput: %.2f flows/s'
+          % (len(latencies), driver.args.concurrency, wall, len(latencies) / wall if wall else 0))
+    print('latency(ms) p50: %.0f  p90: %.0f  p99: %.0f  max: %.0f' % tuple(
+        lc._percentile(latencies, q) * 1000 for q in (0.5, 0.9, 0.99, 1.0)))
+    print('outcomes:')
+    for outcome, count in sorted(driver.outcomes.items()):
+        print('  %-32s %6d' % (outcome, count))
+    print('server: %d requests, responses by status: %s'
+          % (len(fake.requests), ', '.join('%d=%d' % kv for kv in sorted(fake.responses.items()))))
+    print(lc.RATE_LIMITER.report())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent test/submit flows against the local stand-in server')
+    parser.add_argument('--flows', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--problems', type=int, default=10, help='number of problems the flows pick from')
+    parser.add_argument('--submit-ratio', type=float, default=0.3)
+    parser.add_argument('--wrong-ratio', type=float, default=0.2)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.03)
+    parser.add_argument('--judge-rounds', type=int, default=2)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--burst', type=int, default=3)
+    parser.add_argument('--retry-after', type=int)
+    parser.add_argument('--slow-body', type=int, default=0)
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--poll-timeout', type=float, default=10)
+    parser.add_argument('--rate-limit', type=float, default=200.0, help='client side requests per second')
+    parser.add_argument('--rate-burst', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    lc = load_plugin()
+    lc.RATE_LIMITER.configure(args.rate_limit, args.rate_burst)
+    fake = FakeLeetcode(problems=max(50, args.problems), seed=args.seed).start()
+    old_home = os.environ.get('HOME')
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = home
+        try:
+            session, problems = setup(lc, fake, args)
+            fake.latency, fake.jitter = args.latency, args.jitter
+            fake.judge_rounds = args.judge_rounds
+            fake.error_rate, fake.burst, fake.retry_after = args.error_rate, args.burst, args.retry_after
+            fake.slow_body = args.slow_body
+            driver = LoadDriver(lc, session, problems, args)
+            wall = driver.run()
+            report(driver, fake, wall, lc)
+        finally:
+            fake.stop()
+            if old_home is not None:
+                os.environ['HOME'] = old_home
+    if any(outcome.split(': ', 1)[1].startswith('unhandled') for outcome in driver.outcomes):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
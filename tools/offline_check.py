@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+
+from _plugin import load_plugin
+from fake_leetcode import FakeLeetcode
+
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+    print('ok - ' + message)
+
+
+def run(lc, fake):
+    session = lc.LeetcodeSession({'base_url': fake.base_url, 'default_lang': 'java'})
+    session.login('us', 'csrftoken', 'leetcode_session')
+
+    f, msg = session.get_problems('all', False)
+    check(f is not None and os.path.exists(f), 'problem list is fetched online')
+    first = fake.problems['stat_status_pairs'][0]['stat']
+    problem_id, title = first['question_id'], first['question__title_slug']
+    f, msg = session.get_problem_code(problem_id, title, 'java', True)
+    check(f is not None, 'solution file is scaffolded online')
+
+    fake.set_online(False)
+    session.set_offline(True)
+    served = len(fake.requests)
+
+    f, msg = session.get_problems('all', False)
+    check(f is not None, 'problem list is served from the local store while offline')
+    f, msg = session.get_problem_code(problem_id, title, 'java', False)
+    check(f is not None, 'reset is served from the cached question while offline')
+    other = fake.problems['stat_status_pairs'][1]['stat']
+    f, msg = session.get_problem_code(other['question_id'], other['question__title_slug'], 'java', True)
+    check(f is None and 'offline' in msg, 'uncached problem reports it is not available offline')
+
+    with open(session._get_path(lc.LC_SOLUTIONS_HOME) + 'java/'
+              + lc.LeetcodeSession._problem_repr_compact(problem_id, title) + '.java') as inf:
+        code_lines = lc.LeetcodeSession._cut_codes([line.rstrip() for line in inf])
+    msg, _ = session.test_code(problem_id, title, 'java', code_lines, None)
+    check('queued' in msg, 'test is queued while offline')
+    msg, _ = session.submit_code(problem_id, title, 'java', ['// WRONG'] + code_lines)
+    check('queued' in msg, 'wrong submit is queued while offline')
+    msg, _ = session.submit_code(problem_id, title, 'java', code_lines)
+    check('queued' in msg, 'submit is queued while offline')
+    check(session.outbox_size() == 3, 'outbox survives on disk with 3 entries')
+    check(len(fake.requests) == served, 'nothing reached the network while offline')
+
+    session.set_offline(False)
+    results, remaining = session.flush_outbox()
+    check(remaining == 3 and results == [], 'flush keeps the outbox while the server is still down')
+    check(session.outbox_size() == 3, 'outbox still has 3 entries')
+
+    fake.set_online(True)
+    check(session.probe(), 'probe sees the server again')
+    results, remaining = session.flush_outbox()
+    for result in results:
+        print('   ' + result.replace('\n', ' | '))
+    check(remaining == 0 and len(results) == 3, 'all queued requests are flushed')
+    check(results[0].startswith('[test]') and 'Correct' in results[0], 'test result comes first')
+    check(results[1].startswith('[submit]') and 'Wrong Answer' in results[1], 'wrong submit comes second')
+    check(results[2].startswith('[submit]') and 'Accepted' in results[2], 'accepted submit comes last')
+    check(session.outbox_size() == 0, 'outbox is empty after the flush')
+
+
+def main():
+    lc = load_plugin()
+    old_home = os.environ.get('HOME')
+    fake = FakeLeetcode().start()
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = home
+        try:
+            run(lc, fake)
+        except AssertionError as e:
+            print('not ok - %s' % e)
+            return 1
+        finally:
+            fake.stop()
+            if old_home is not None:
+                os.environ['HOME'] = old_home
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())